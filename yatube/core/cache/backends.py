@@ -0,0 +1,352 @@
+"Двухуровневый кэш: LRU в памяти процесса (L1) + общий SQLite-файл (L2)."
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.db.sqlite import apply_pragmas
+
+
+# Django создает экземпляр бэкенда на каждый поток, поэтому L1, как и
+# в LocMemCache, хранится на уровне модуля и общий для всего процесса
+_local_stores = {}
+_local_stores_lock = Lock()
+
+# ограничение SQLite на число параметров в одном запросе
+MAX_QUERY_PARAMS = 500
+
+# флаги формата значения в L2
+RAW = b'p'
+COMPRESSED = b'z'
+
+L2_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+}
+
+
+class LocalLRU:
+    """Потокобезопасный LRU с истечением записей. Хранит pickle-байты."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, data = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def set(self, key, data, expires):
+        with self._lock:
+            self._data[key] = (expires, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    L1 — небольшой LRU в памяти процесса, L2 — SQLite-файл, общий для
+    всех процессов (LOCATION). Запись в L1 живет не дольше L1_TIMEOUT
+    секунд: так ограничено время, которое процесс может отдавать
+    значение, уже измененное или удаленное другим процессом.
+    Значения длиннее COMPRESS_MIN_LENGTH байт хранятся в L2 сжатыми.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._compress_min_length = options.get('COMPRESS_MIN_LENGTH', 1024)
+        self._cull_every = options.get('CULL_EVERY', 100)
+        with _local_stores_lock:
+            self._l1 = _local_stores.setdefault(
+                location, LocalLRU(options.get('L1_MAX_ENTRIES', 1000))
+            )
+        self._conn = None
+        self._writes = 0
+
+    # L2
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self._path,
+                timeout=5,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            apply_pragmas(conn.cursor(), L2_PRAGMAS)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _fetch(self, keys):
+        """Читает из L2 живые записи: {key: (pickle-байты, expires)}."""
+        conn = self._connection()
+        now = time.time()
+        found = {}
+        for start in range(0, len(keys), MAX_QUERY_PARAMS):
+            chunk = keys[start:start + MAX_QUERY_PARAMS]
+            rows = conn.execute(
+                'SELECT key, value, expires FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*chunk, now),
+            )
+            for key, value, expires in rows:
+                found[key] = (self._decode(value), expires)
+        return found
+
+    def _store(self, conn, items, expires):
+        conn.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            [(key, self._encode(data), expires) for key, data in items],
+        )
+        self._writes += len(items)
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull(conn)
+
+    def _cull(self, conn):
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache')
+            return
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY COALESCE(expires, 1e18) LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
+
+    def _encode(self, data):
+        if len(data) >= self._compress_min_length:
+            return COMPRESSED + zlib.compress(data)
+        return RAW + data
+
+    def _decode(self, value):
+        flag, data = value[:1], value[1:]
+        if flag == COMPRESSED:
+            return zlib.decompress(data)
+        return data
+
+    # L1
+
+    def _remember(self, key, data, expires):
+        l1_expires = time.time() + self._l1_timeout
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+        self._l1.set(key, data, l1_expires)
+
+    # API BaseCache
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made[made_key] = key
+        result = {}
+        missing = []
+        for made_key, key in made.items():
+            data = self._l1.get(made_key)
+            if data is None:
+                missing.append(made_key)
+            else:
+                result[key] = pickle.loads(data)
+        if missing:
+            for made_key, (data, expires) in self._fetch(missing).items():
+                self._remember(made_key, data, expires)
+                result[made[made_key]] = pickle.loads(data)
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        items = []
+        for key, value in data.items():
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            items.append(
+                (made_key, pickle.dumps(value, self.pickle_protocol))
+            )
+        with self._transaction() as conn:
+            self._store(conn, items, expires)
+        for made_key, pickled in items:
+            self._remember(made_key, pickled, expires)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        expires = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._transaction() as conn:
+            conn.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (made_key, time.time()),
+            )
+            added = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (made_key, self._encode(pickled), expires),
+            ).rowcount == 1
+        if added:
+            self._remember(made_key, pickled, expires)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        self._l1.delete(made_key)
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), made_key, time.time()),
+            ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        # атомарно для всех процессов: чтение и запись в одной
+        # транзакции BEGIN IMMEDIATE
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        self._l1.delete(made_key)
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (made_key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(self._decode(row[0])) + delta
+            conn.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (
+                    self._encode(
+                        pickle.dumps(new_value, self.pickle_protocol)
+                    ),
+                    made_key,
+                ),
+            )
+        return new_value
+
+    def update(self, key, func, version=None):
+        """
+        Атомарное для всех процессов чтение-изменение-запись за одну
+        транзакцию BEGIN IMMEDIATE. func получает текущее значение (None,
+        если записи нет) и возвращает (новое значение, timeout) или None,
+        чтобы ничего не менять. Возвращает то, что вернула func.
+        """
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        self._l1.delete(made_key)
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (made_key, time.time()),
+            ).fetchone()
+            value = None
+            if row is not None:
+                value = pickle.loads(self._decode(row[0]))
+            result = func(value)
+            if result is not None:
+                new_value, timeout = result
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, value, expires) '
+                    'VALUES (?, ?, ?)',
+                    (
+                        made_key,
+                        self._encode(
+                            pickle.dumps(new_value, self.pickle_protocol)
+                        ),
+                        self.get_backend_timeout(timeout),
+                    ),
+                )
+        return result
+
+    def has_key(self, key, version=None):
+        made_key = self.make_key(key, version=version)
+        self.validate_key(made_key)
+        if self._l1.get(made_key) is not None:
+            return True
+        return bool(self._fetch([made_key]))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made_keys = []
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            self._l1.delete(made_key)
+            made_keys.append(made_key)
+        with self._transaction() as conn:
+            conn.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(made_key,) for made_key in made_keys],
+            )
+
+    def clear(self):
+        self._l1.clear()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # соединение с L2 живет вместе с экземпляром (один на поток)
+        pass
@@ -0,0 +1,70 @@
+"""
+Ограничение частоты запросов корзиной токенов в кэше.
+
+Корзина на tokens запросов пополняется целиком за seconds секунд.
+Состояние корзины — одно число в кэше: момент в миллисекундах, когда
+она снова станет полной (алгоритм GCRA). Каждый запрос атомарно
+сдвигает этот момент на стоимость одного токена; если он ушел дальше,
+чем на размер корзины, запрос отклоняется. Запись в базу на каждый
+запрос не нужна.
+
+В TieredCache проверка, сдвиг и новый срок жизни записи выполняются
+одним cache.update — одной транзакцией BEGIN IMMEDIATE в общем L2,
+а отклоненный запрос ничего не пишет. Для других кэшей (memcached,
+redis) сдвиг делает атомарный incr, отказ откатывается через decr, а
+срок продлевается через touch.
+
+Запись живет, пока корзина не наполнится. Истекает она с точностью до
+секунды, поэтому за эту секунду клиент может получить не больше
+tokens / seconds лишних запросов.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def take(key, tokens, seconds, cache=None):
+    """
+    Берет токен из корзины key. Возвращает 0, если запрос разрешен,
+    иначе — через сколько секунд появится следующий токен.
+    """
+    cache = cache or caches[settings.RATE_LIMIT_CACHE_ALIAS]
+    interval = max(1, round(seconds * 1000 / tokens))
+    now = int(time.time() * 1000)
+    if hasattr(cache, 'update'):
+        return _take_atomic(cache, key, tokens, interval, now)
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:
+        # корзины нет или она уже полна: создаем ее с одним взятым
+        # токеном, при гонке с другим запросом повторяем incr
+        if cache.add(key, now + interval, math.ceil(interval / 1000)):
+            return 0
+        full_at = cache.incr(key, interval)
+    # полная корзина, которую кэш еще не удалил, считается от now
+    full_at = max(full_at - interval, now) + interval
+    excess = full_at - now - tokens * interval
+    if excess > 0:
+        cache.decr(key, interval)
+        return math.ceil(excess / 1000)
+    cache.touch(key, math.ceil((full_at - now) / 1000))
+    return 0
+
+
+def _take_atomic(cache, key, tokens, interval, now):
+    wait = 0
+
+    def step(full_at):
+        nonlocal wait
+        # нет корзины или она уже полна — считаем от now
+        full_at = max(full_at or now, now) + interval
+        excess = full_at - now - tokens * interval
+        if excess > 0:
+            wait = math.ceil(excess / 1000)
+            return None
+        return full_at, math.ceil((full_at - now) / 1000)
+
+    cache.update(key, step)
+    return wait
@@ -0,0 +1,114 @@
+"""
+Защита от одновременного пересчета дорогих записей кэша.
+
+Запись хранится как (значение, мягкий срок, время вычисления) и живет
+в кэше на CACHE_STALE_SECONDS дольше мягкого срока. После мягкого
+срока значение пересчитывает один запрос — тот, кто взял блокировку,
+остальные пока отдают устаревшее значение. Кроме того, запись может
+быть обновлена заранее с вероятностью, растущей к концу срока
+(алгоритм XFetch): чем дороже вычисление, тем раньше начнется
+пересчет.
+"""
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _should_refresh(soft_expires, delta, now):
+    if soft_expires is None:
+        return False
+    # 1 - random() лежит в (0, 1], логарифм определен
+    gap = -delta * settings.CACHE_EARLY_REFRESH_BETA * math.log(
+        1.0 - random.random()
+    )
+    return now + gap >= soft_expires
+
+
+def _recompute(cache, key, compute, timeout, cacheable):
+    try:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        if cacheable is None or cacheable(value):
+            if timeout is None:
+                soft_expires = hard_timeout = None
+            else:
+                soft_expires = time.time() + timeout
+                hard_timeout = timeout + settings.CACHE_STALE_SECONDS
+            cache.set(key, (value, soft_expires, delta), hard_timeout)
+        return value
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def get_or_recompute(key, compute, timeout, cache=None, cacheable=None):
+    """
+    Возвращает значение из кэша, пересчитывая его не более чем одним
+    запросом одновременно. cacheable(value) позволяет не сохранять
+    отдельные результаты (например, ответы с ошибкой).
+    """
+    cache = cache or default_cache
+    lock_key = _lock_key(key)
+    entry = cache.get(key)
+    if entry is not None:
+        value, soft_expires, delta = entry
+        if not _should_refresh(soft_expires, delta, time.time()):
+            return value
+        if not cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT):
+            # пересчитывает другой запрос, отдаем устаревшее значение
+            return value
+        return _recompute(cache, key, compute, timeout, cacheable)
+    if cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT):
+        return _recompute(cache, key, compute, timeout, cacheable)
+    # устаревшего значения нет: ждем, пока его посчитает другой запрос
+    deadline = time.time() + settings.CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
+
+
+def cached_view(timeout, cache=None):
+    """
+    Кэширует ответ представления с защитой от одновременного пересчета.
+    Ключ учитывает представление, полный путь запроса и пользователя.
+    Кэшируются только успешные ответы на GET и HEAD.
+    """
+    def decorator(view_func):
+        view_name = f'{view_func.__module__}.{view_func.__qualname__}'
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            path = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            user_id = getattr(getattr(request, 'user', None), 'pk', None)
+            key = f'view:{view_name}:{user_id or 0}:{path}'
+
+            def compute():
+                response = view_func(request, *args, **kwargs)
+                if callable(getattr(response, 'render', None)):
+                    response = response.render()
+                return response
+
+            return get_or_recompute(
+                key, compute, timeout, cache,
+                cacheable=lambda response: (
+                    response.status_code == 200 and not response.streaming
+                ),
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,188 @@
+"""
+Очередь записи с групповыми коммитами.
+
+SQLite пропускает одного писателя за раз: при всплеске комментариев
+каждый запрос открывает свою транзакцию, ждет блокировку и часть
+запросов получает "database is locked". WriteQueue собирает записи
+всех потоков процесса и выполняет их в отдельном потоке-писателе
+пачками: одна транзакция на WRITE_QUEUE_WINDOW_MS миллисекунд
+(или WRITE_QUEUE_MAX_BATCH записей), каждая запись в своей точке
+сохранения. Запрос ждет коммита своей пачки и получает результат
+своей функции или ее исключение.
+
+Очередь выключена по умолчанию (WRITE_QUEUE_WINDOW_MS = 0): на одном
+процессе с WAL и busy_timeout bench_writes показывает примерно 15k
+записей/с транзакцией на запрос против 5-11k/с через очередь, а окно
+добавляет задержку каждой записи. Включать ее стоит, когда писателей
+много процессов, fsync медленный и bench_writes на этом диске
+показывает выигрыш.
+
+WriteTimeout означает "результат неизвестен", а не "запись не
+выполнена": запись, которую писатель еще не начал, отменяется, но
+начатая может закоммититься уже после исключения. Поэтому через
+очередь должны идти записи, которые безопасно повторить.
+
+Фоновые записи (enqueue) всегда идут через поток-писатель, даже при
+WRITE_QUEUE_WINDOW_MS = 0, и запрос их не ждет. Писатель выполняет
+их после коммита пачки и вне ее транзакции: такая запись сама
+открывает свои транзакции, ее длинная работа не держит блокировку
+пачки с записями запросов, а ее ошибка не откатывает чужие записи.
+Ошибку фоновой записи некому вернуть, поэтому она пишется в лог.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+
+from core.db import routers
+
+logger = logging.getLogger(__name__)
+
+
+class WriteTimeout(Exception):
+    """Пачка не успела закоммититься за WRITE_QUEUE_TIMEOUT секунд;
+    начатая запись еще может закоммититься."""
+
+
+class _Write:
+    __slots__ = (
+        'func', 'using', 'detached', 'done', 'result', 'error', 'cancelled',
+    )
+
+    def __init__(self, func, using, detached=False):
+        self.func = func
+        self.using = using
+        self.detached = detached
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+
+class WriteQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, using='default'):
+        """Выполняет func() в групповой транзакции и возвращает результат.
+
+        Внутри открытой транзакции (ATOMIC_REQUESTS, тесты) или при
+        WRITE_QUEUE_WINDOW_MS = 0 запись выполняется сразу в текущем
+        потоке: поток-писатель не увидел бы незакоммиченных данных.
+        """
+        if (
+            not settings.WRITE_QUEUE_WINDOW_MS
+            or connections[using].in_atomic_block
+        ):
+            return func()
+        # роутер увидит запись в потоке-писателе, а закрепить за
+        # основной базой нужно пользователя этого запроса
+        routers.mark_written()
+        write = _Write(func, using)
+        self._start()
+        self._queue.put(write)
+        if not write.done.wait(settings.WRITE_QUEUE_TIMEOUT):
+            write.cancelled = True
+            raise WriteTimeout('Запись не подтверждена вовремя')
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def enqueue(self, func, using='default'):
+        """Выполняет func() в потоке-писателе, без ожидания и результата.
+
+        Для записей, потерю которых при падении процесса можно
+        пережить (уведомления). func выполняется вне пачки и сама
+        управляет транзакциями; ее ошибка пишется в лог. Внутри
+        открытой транзакции запись уходит писателю после ее коммита:
+        до него писатель не увидел бы данных запроса. С базой SQLite в
+        памяти (тесты) запись выполняется сразу: общий кэш такой базы
+        не ждет блокировку, и писатель, работающий параллельно с
+        запросом, получил бы "table is locked".
+        """
+        connection = connections[using]
+        if connection.in_atomic_block:
+            transaction.on_commit(
+                lambda: self.enqueue(func, using), using=using
+            )
+            return
+        write = _Write(func, using, detached=True)
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self._detached(write)
+            return
+        self._start()
+        self._queue.put(write)
+
+    def save(self, obj):
+        """obj.save() в той базе, которую выберет роутер."""
+        using = router.db_for_write(type(obj), instance=obj)
+        return self.submit(obj.save, using or 'default')
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='write-queue', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + settings.WRITE_QUEUE_WINDOW_MS / 1000
+        while len(batch) < settings.WRITE_QUEUE_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            by_db, detached = {}, []
+            for write in self._collect():
+                if write.detached:
+                    detached.append(write)
+                else:
+                    by_db.setdefault(write.using, []).append(write)
+            for using, writes in by_db.items():
+                self._commit(using, writes)
+            for write in detached:
+                self._detached(write)
+
+    def _detached(self, write):
+        try:
+            write.func()
+        except Exception:
+            logger.exception('Фоновая запись %r не выполнена', write.func)
+
+    def _commit(self, using, writes):
+        try:
+            with transaction.atomic(using=using):
+                for write in writes:
+                    if write.cancelled:
+                        continue
+                    try:
+                        with transaction.atomic(using=using):
+                            write.result = write.func()
+                    except Exception as error:
+                        write.error = error
+        except DatabaseError as error:
+            # коммит пачки не прошел: ошибка достается всем записям,
+            # соединение открываем заново на следующей пачке
+            for write in writes:
+                write.error = write.error or error
+            connections[using].close()
+        finally:
+            for write in writes:
+                write.done.set()
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,67 @@
+import random
+import threading
+
+from django.conf import settings
+
+
+# приложения, которые всегда читаются с основной базы:
+# сессия, созданная при входе, может еще не доехать до реплики
+PRIMARY_ONLY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+def begin_request(read_only=False, pinned=False):
+    _state.read_only = read_only
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def set_read_only(read_only):
+    _state.read_only = read_only
+
+
+def mark_written():
+    """Запрос писал в базу: пользователь закрепляется за основной."""
+    _state.wrote = True
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def end_request():
+    begin_request()
+
+
+class ReplicaRouter:
+    """Чтение в read-only представлениях уходит на реплики, запись на
+    основную базу. Пользователь, который только что писал, закреплен
+    за основной базой (см. core.middleware.replicas)."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or not getattr(_state, 'read_only', False)
+            or getattr(_state, 'pinned', False)
+        ):
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        mark_written()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # реплики получают схему вместе с данными из sync_replicas
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+# порядок важен: journal_mode переключаем до остальных настроек
+PRAGMA_ORDER = (
+    'journal_mode',
+    'synchronous',
+    'busy_timeout',
+    'cache_size',
+    'mmap_size',
+    'temp_store',
+)
+
+
+def apply_pragmas(cursor, pragmas):
+    """Применяет профиль PRAGMA к открытому соединению SQLite."""
+    names = sorted(
+        pragmas,
+        key=lambda name: (
+            PRAGMA_ORDER.index(name) if name in PRAGMA_ORDER
+            else len(PRAGMA_ORDER)
+        )
+    )
+    for name in names:
+        cursor.execute(f'PRAGMA {name} = {pragmas[name]}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Настройка каждого нового соединения SQLite по SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+def connect_signals():
+    connection_created.connect(
+        configure_sqlite, dispatch_uid='core.db.sqlite.configure_sqlite'
+    )
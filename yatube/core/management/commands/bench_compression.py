@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.middleware.compression import (
+    brotli_compressor, gzip_compressor, minify_html,
+)
+from core.storage import brotli
+
+
+class Command(BaseCommand):
+    help = (
+        'Размер и процессорное время на запрос для страницы: '
+        'без обработки, минификация, gzip и br'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with override_settings(HTML_MINIFY=False):
+            response = Client().get(options['path'])
+        html = response.content.decode(response.charset)
+        minified = minify_html(html)
+        variants = [
+            ('исходный HTML', lambda: html.encode()),
+            ('минификация', lambda: minify_html(html).encode()),
+            ('gzip', lambda: self.compress(gzip_compressor, html)),
+            ('минификация + gzip',
+             lambda: self.compress(gzip_compressor, minify_html(html))),
+        ]
+        if brotli is not None:
+            variants += [
+                ('br', lambda: self.compress(brotli_compressor, html)),
+                ('минификация + br',
+                 lambda: self.compress(brotli_compressor, minify_html(html))),
+            ]
+        self.stdout.write(
+            f'{options["path"]}: {len(html.encode())} байт, '
+            f'после минификации {len(minified.encode())}'
+        )
+        for name, process in variants:
+            started = time.process_time()
+            for _ in range(options['repeat']):
+                body = process()
+            cpu = (time.process_time() - started) / options['repeat']
+            self.stdout.write(
+                f'{name:>20}: {len(body):>7} байт, {cpu * 1000:.3f} мс CPU'
+            )
+
+    def compress(self, compressor, html):
+        compress, finish = compressor()
+        return compress(html.encode()) + finish()
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db.sqlite import apply_pragmas
+
+
+SCHEMA = (
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'post_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, '
+    'created REAL NOT NULL)'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Конкурентный бенчмарк чтения/записи SQLite: '
+        'настройки по умолчанию против профиля SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for name, pragmas in profiles:
+            result = self.run_profile(pragmas, options)
+            self.stdout.write(
+                f'{name:>15}: '
+                f'запись {result["writes"] / options["seconds"]:.0f} оп/с, '
+                f'чтение {result["reads"] / options["seconds"]:.0f} оп/с, '
+                f'ошибок блокировки {result["locked"]}'
+            )
+
+    def run_profile(self, pragmas, options):
+        result = {'writes': 0, 'reads': 0, 'locked': 0}
+        lock = threading.Lock()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            conn = self.connect(path, pragmas)
+            conn.execute(SCHEMA)
+            conn.close()
+            deadline = time.monotonic() + options['seconds']
+            threads = [
+                threading.Thread(
+                    target=self.worker,
+                    args=(path, pragmas, deadline, kind, result, lock),
+                )
+                for kind, count in (
+                    ('writes', options['writers']),
+                    ('reads', options['readers']),
+                )
+                for _ in range(count)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return result
+
+    def connect(self, path, pragmas):
+        # как и Django, работаем в autocommit и управляем транзакциями сами
+        conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(conn.cursor(), pragmas)
+        return conn
+
+    def worker(self, path, pragmas, deadline, kind, result, lock):
+        conn = self.connect(path, pragmas)
+        done = locked = 0
+        while time.monotonic() < deadline:
+            try:
+                if kind == 'writes':
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute(
+                        'INSERT INTO comment (post_id, text, created) '
+                        'VALUES (?, ?, ?)',
+                        (done % 100, 'Тестовый комментарий', time.time())
+                    )
+                    conn.execute('COMMIT')
+                else:
+                    conn.execute(
+                        'SELECT id, text FROM comment WHERE post_id = ? '
+                        'ORDER BY id DESC LIMIT 10', (done % 100,)
+                    ).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+        conn.close()
+        with lock:
+            result[kind] += done
+            result['locked'] += locked
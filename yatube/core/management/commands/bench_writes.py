@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.db import DatabaseError, connections, transaction
+from django.core.management.base import BaseCommand
+
+from core.db.batching import write_queue
+
+
+ALIAS = 'bench_writes'
+
+SCHEMA = (
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'post_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, '
+    'created REAL NOT NULL)'
+)
+
+
+def insert(number):
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO comment (post_id, text, created) VALUES (%s, %s, %s)',
+            (number % 100, 'Тестовый комментарий', time.time())
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Конкурентный бенчмарк записи через Django: транзакция на запрос '
+        'против групповых коммитов core.db.batching'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            connections.databases[ALIAS] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'bench.sqlite3'),
+            }
+            connections.ensure_defaults(ALIAS)
+            connections.prepare_test_settings(ALIAS)
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute(SCHEMA)
+            for name, write in (
+                ('транзакция на запрос', self.direct),
+                ('групповой коммит', self.queued),
+            ):
+                result = self.run(write, options)
+                self.stdout.write(
+                    f'{name:>20}: '
+                    f'{result["writes"] / options["seconds"]:.0f} записей/с, '
+                    f'ошибок {result["errors"]}'
+                )
+            connections[ALIAS].close()
+            del connections.databases[ALIAS]
+
+    def direct(self, number):
+        with transaction.atomic(using=ALIAS):
+            insert(number)
+
+    def queued(self, number):
+        write_queue.submit(lambda: insert(number), using=ALIAS)
+
+    def run(self, write, options):
+        result = {'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(
+                target=self.worker, args=(write, deadline, result, lock)
+            )
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    def worker(self, write, deadline, result, lock):
+        done = errors = 0
+        while time.monotonic() < deadline:
+            try:
+                write(done)
+                done += 1
+            except DatabaseError:
+                errors += 1
+        connections[ALIAS].close()
+        with lock:
+            result['writes'] += done
+            result['errors'] += errors
@@ -0,0 +1,158 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core.middleware.static import accepted_encodings
+from core.storage import brotli
+
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+# содержимое этих тегов выводится как есть, пробелы в нем значимы
+PROTECTED_RE = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL
+)
+SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
+
+
+def _collapse(text):
+    # строки без отступов и без пустых строк; str.strip и split
+    # работают на C и заметно быстрее одной регулярки на весь текст
+    if not text:
+        return text
+    body = '\n'.join(filter(None, (line.strip() for line in text.split('\n'))))
+    if '  ' in body or '\t' in body:
+        body = SPACE_RUN_RE.sub(' ', body)
+    lead = '\n' if text[0].isspace() else ''
+    trail = '\n' if text[-1].isspace() else ''
+    if not body:
+        return lead or trail
+    return lead + body + trail
+
+
+def minify_html(html):
+    """Убирает отступы и пустые строки вне pre, textarea, script, style.
+
+    Пробелы между словами и тегами не удаляются полностью, а сводятся
+    к одному переводу строки или пробелу, поэтому отображение
+    страницы не меняется.
+    """
+    parts = PROTECTED_RE.split(html)
+    # split с двумя группами: текст, блок, имя тега, текст, ...
+    for index in range(0, len(parts), 3):
+        parts[index] = _collapse(parts[index])
+    return ''.join(
+        part for index, part in enumerate(parts) if index % 3 != 2
+    )
+
+
+def gzip_compressor():
+    # wbits 16 + MAX_WBITS: формат gzip, а не голый zlib
+    compressor = zlib.compressobj(
+        settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    return (
+        lambda data: compressor.compress(data)
+        + compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def brotli_compressor():
+    compressor = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+    return (
+        lambda data: compressor.process(data) + compressor.flush(),
+        compressor.finish,
+    )
+
+
+def compress_stream(chunks, compressor):
+    """Сжимает поток по частям: каждая часть уходит клиенту сразу."""
+    compress, finish = compressor
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """Минифицирует HTML и сжимает ответы br или gzip.
+
+    Обычный ответ сжимается целиком, если он длиннее
+    RESPONSE_COMPRESS_MIN_LENGTH и сжатие дает выигрыш. Потоковый
+    ответ сжимается по частям с flush после каждой, так что
+    SSE и большие файлы не буферизуются. Уже сжатые ответы (статика
+    .br/.gz, изображения) и ответы на Range не трогаются, сильный
+    ETag становится слабым, в Vary добавляется Accept-Encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.has_header('Content-Encoding')
+            # смещения Content-Range указывают в несжатый файл
+            or response.status_code == 206
+            or response.has_header('Content-Range')
+        ):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming:
+            if settings.HTML_MINIFY and content_type.startswith('text/html'):
+                self.minify(response)
+            if len(response.content) < settings.RESPONSE_COMPRESS_MIN_LENGTH:
+                return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if brotli is not None and 'br' in accepted:
+            encoding, compressor = 'br', brotli_compressor
+        elif 'gzip' in accepted:
+            encoding, compressor = 'gzip', gzip_compressor
+        else:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, compressor()
+            )
+            del response['Content-Length']
+        else:
+            compress, finish = compressor()
+            content = compress(response.content) + finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        self.weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
+
+    def minify(self, response):
+        charset = response.charset
+        html = response.content.decode(charset)
+        minified = minify_html(html)
+        if len(minified) == len(html):
+            return
+        response.content = minified.encode(charset)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        self.weaken_etag(response)
+
+    def weaken_etag(self, response):
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
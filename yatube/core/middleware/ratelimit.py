@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.shortcuts import render
+
+from core.cache.ratelimit import take
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к RATE_LIMITS по пользователю или IP.
+
+    Для представлений из RATE_LIMIT_DEEP_PAGES ограничиваются только
+    анонимные запросы страниц дальше RATE_LIMIT_DEEP_PAGE: первые
+    страницы читают люди, глубокие — обходчики, и каждая такая
+    страница — дорогой OFFSET. Сверх лимита отдается 429 с Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        limit = self.limit(request, view_name)
+        if limit is None:
+            return None
+        if request.user.is_authenticated:
+            client = f'user:{request.user.pk}'
+        else:
+            client = f'ip:{request.META.get("REMOTE_ADDR", "")}'
+        retry_after = take(f'ratelimit:{view_name}:{client}', *limit)
+        if not retry_after:
+            return None
+        response = render(
+            request, 'core/429.html', {'retry_after': retry_after},
+            status=429,
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def limit(self, request, view_name):
+        if view_name in settings.RATE_LIMITS:
+            tokens, seconds, methods = settings.RATE_LIMITS[view_name]
+            if request.method in methods:
+                return tokens, seconds
+        if (
+            view_name in settings.RATE_LIMIT_DEEP_PAGES
+            and not request.user.is_authenticated
+        ):
+            try:
+                page = int(request.GET.get('page', 1))
+            except ValueError:
+                page = 1
+            if page > settings.RATE_LIMIT_DEEP_PAGE:
+                return settings.RATE_LIMIT_DEEP_PAGES[view_name]
+        return None
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+
+from core.db import routers
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для DATABASE_REPLICA_VIEWS и закрепляет
+    пользователя за основной базой на DATABASE_REPLICA_STICKY_SECONDS
+    после любой записи (read-your-writes)."""
+
+    cookie_name = 'db_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            pinned_until = 0
+        routers.begin_request(pinned=pinned_until > time.time())
+        try:
+            response = self.get_response(request)
+            if settings.DATABASE_REPLICAS and routers.has_written():
+                sticky = settings.DATABASE_REPLICA_STICKY_SECONDS
+                response.set_cookie(
+                    self.cookie_name,
+                    str(time.time() + sticky),
+                    max_age=sticky,
+                    httponly=True,
+                )
+        finally:
+            routers.end_request()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.set_read_only(
+            request.resolver_match.view_name
+            in settings.DATABASE_REPLICA_VIEWS
+        )
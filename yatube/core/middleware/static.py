@@ -0,0 +1,95 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from core.storage import encodings
+
+
+# имя с хешем содержимого от ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещенных q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Отдает собранную статику из STATIC_ROOT до остальных middleware.
+
+    Если клиент принимает br или gzip и collectstatic положил рядом
+    сжатую копию, отдается она. Файлы с хешем в имени кэшируются
+    навсегда (immutable), остальные — на STATIC_MAX_AGE секунд.
+    """
+
+    content_encodings = {'.br': 'br', '.gz': 'gzip'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            request.method in ('GET', 'HEAD')
+            and settings.STATIC_ROOT
+            and request.path.startswith(settings.STATIC_URL)
+        ):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request):
+        name = request.path[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size,
+        ):
+            return HttpResponseNotModified()
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        content_encoding = None
+        for suffix, _ in encodings():
+            coding = self.content_encodings[suffix]
+            if coding in accepted and os.path.isfile(path + suffix):
+                path, content_encoding = path + suffix, coding
+                break
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if HASHED_NAME_RE.search(name):
+            response['Cache-Control'] = (
+                'public, max-age=31536000, immutable'
+            )
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_MAX_AGE}'
+            )
+        return response
@@ -0,0 +1,59 @@
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator без полного COUNT(*) по всей таблице. Точно считаются
+    только первые exact_limit строк; для большей таблицы без фильтров
+    число строк оценивается по MAX(pk), который берется из индекса
+    первичного ключа. Отфильтрованный список считается точно: MAX(pk)
+    для него ничего не значит, а обрезанный счет спрятал бы страницы
+    после exact_limit.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset.values('pk').order_by().count()
+        exact = queryset.values('pk').order_by()[:self.exact_limit + 1].count()
+        if exact <= self.exact_limit:
+            return exact
+        estimate = queryset.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        return max(exact, estimate)
+
+
+def _after(keys, values):
+    # (k1, k2) > (v1, v2) как k1 > v1 OR (k1 = v1 AND k2 > v2)
+    condition = Q()
+    for index, key in enumerate(keys):
+        step = Q(**{f'{key}__gt': values[index]})
+        for prefix, value in zip(keys[:index], values):
+            step &= Q(**{prefix: value})
+        condition |= step
+    return condition
+
+
+def walk(queryset, keys, fields, chunk_size=2000):
+    """
+    Все строки queryset.values_list(*keys, *fields) по возрастанию keys,
+    пачками по chunk_size запросами WHERE keys > последний ключ. В
+    отличие от OFFSET каждая пачка стоит одинаково, а в отличие от
+    iterator() ни одна транзакция чтения не длится весь обход.
+    keys должны быть уникальны и покрыты индексом.
+    """
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(_after(keys, last))
+        rows = list(
+            chunk.order_by(*keys).values_list(*keys, *fields)[:chunk_size]
+        )
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][:len(keys)]
@@ -0,0 +1,92 @@
+"""
+Публикация и подписка внутри процесса.
+
+Подписка получает сообщения всех своих каналов в ограниченный буфер и
+ждет их на Condition, не опрашивая ничего в цикле. Общее число
+подписок ограничено: каждая держит поток сервера (например, открытый
+поток SSE), и без предела долгие соединения заняли бы все потоки.
+
+Сообщения не выходят за пределы процесса: подписчик видит только то,
+что опубликовал его же процесс.
+"""
+import threading
+from collections import deque
+
+
+class Full(Exception):
+    """Достигнут предел числа подписок."""
+
+
+class Subscription:
+    def __init__(self, broker, channels, max_pending):
+        self.channels = tuple(dict.fromkeys(channels))
+        self._broker = broker
+        self._messages = deque(maxlen=max_pending)
+        self._ready = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def deliver(self, message):
+        with self._ready:
+            # при переполнении теряются самые старые сообщения
+            self._messages.append(message)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """Все накопленные сообщения; [] если за timeout ничего нет."""
+        with self._ready:
+            if not self._messages:
+                self._ready.wait(timeout)
+            messages = list(self._messages)
+            self._messages.clear()
+        return messages
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._subscriptions = set()
+
+    def subscribe(self, channels, limit=None, max_pending=100):
+        """Подписка на каналы; Full, если подписок уже limit."""
+        with self._lock:
+            if limit is not None and len(self._subscriptions) >= limit:
+                raise Full('Слишком много подписок')
+            subscription = Subscription(self, channels, max_pending)
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+            for channel in subscription.channels:
+                subscribers = self._channels[channel]
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    @property
+    def subscribers(self):
+        return len(self._subscriptions)
+
+
+broker = Broker()
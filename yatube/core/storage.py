@@ -0,0 +1,72 @@
+"""
+Хранилище статики: имена с хешем содержимого и сжатые копии.
+
+collectstatic записывает каждый файл под именем с хешем
+(bootstrap.min.3e9f1c2a7b4d.css) и рядом сжатые .gz и .br, если сжатие
+дает выигрыш. Такой файл никогда не меняется, поэтому
+core.middleware.static отдает его с Cache-Control: immutable, а
+браузер не перепроверяет его до следующего релиза.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# форматы, которые уже сжаты (png, jpg, woff2), повторно не жмем
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml', '.map', '.html',
+)
+
+
+def encodings():
+    """[(расширение, функция сжатия)] в порядке предпочтения."""
+    result = []
+    if brotli is not None:
+        result.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    result.append(('.gz', lambda data: gzip.compress(data, 9, mtime=0)))
+    return result
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        # пока collectstatic не запускали (разработка, тесты), отдаем
+        # файл под исходным именем вместо ошибки о пустом манифесте
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(hashed):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Пишет .br/.gz рядом с файлом, если они заметно меньше."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, compress in encodings():
+            packed = compress(data)
+            if len(packed) > len(data) * settings.STATIC_COMPRESS_MAX_RATIO:
+                continue
+            with open(self.path(name) + suffix, 'wb') as target:
+                target.write(packed)
+            yield name + suffix
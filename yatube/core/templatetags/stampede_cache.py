@@ -0,0 +1,57 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.cache.stampede import get_or_recompute
+
+
+register = template.Library()
+
+
+class StampedeCacheNode(CacheNode):
+    """{% cache %}, который пересчитывает фрагмент одним запросом."""
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                '"cache" tag got an unknown variable: %r'
+                % self.expire_time_var.var
+            )
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: %r'
+                    % expire_time
+                )
+        if self.cache_name:
+            fragment_cache = caches[self.cache_name.resolve(context)]
+        else:
+            try:
+                fragment_cache = caches['template_fragments']
+            except InvalidCacheBackendError:
+                fragment_cache = caches['default']
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_recompute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            fragment_cache,
+        )
+
+
+@register.tag('cache')
+def do_stampede_cache(parser, token):
+    """Синтаксис совпадает со стандартным {% cache %}."""
+    node = do_cache(parser, token)
+    return StampedeCacheNode(
+        node.nodelist,
+        node.expire_time_var,
+        node.fragment_name,
+        node.vary_on,
+        node.cache_name,
+    )
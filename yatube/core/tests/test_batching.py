@@ -0,0 +1,127 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from core.db import routers
+from core.db.batching import WriteTimeout, write_queue
+from core.middleware.replicas import ReplicaMiddleware
+from posts.models import Follow, Group
+
+
+User = get_user_model()
+
+
+def create_group(slug):
+    return Group.objects.create(
+        title='Тестовая группа', slug=slug, description='Тестовое описание'
+    )
+
+
+class WriteQueueInlineTest(TestCase):
+    def test_runs_inline_in_transaction(self):
+        """Внутри транзакции запись выполняется сразу в том же потоке."""
+        group = write_queue.submit(lambda: create_group('inline'))
+        self.assertTrue(Group.objects.filter(pk=group.pk).exists())
+
+
+@override_settings(WRITE_QUEUE_WINDOW_MS=2)
+class WriteQueueTest(TransactionTestCase):
+    def test_concurrent_writes_confirmed(self):
+        """Конкурентные записи коммитятся пачками, каждый поток получает
+        свой результат, ошибка одной записи не откатывает остальные."""
+        slugs = ['slug-0', 'slug-1', 'slug-2', 'slug-3', 'slug-0']
+        results = {}
+
+        def submit(number, slug):
+            try:
+                results[number] = write_queue.submit(
+                    lambda: create_group(slug)
+                )
+            except IntegrityError as error:
+                results[number] = error
+
+        threads = [
+            threading.Thread(target=submit, args=(number, slug))
+            for number, slug in enumerate(slugs)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        errors = [
+            result for result in results.values()
+            if isinstance(result, IntegrityError)
+        ]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(Group.objects.count(), 4)
+        for result in results.values():
+            if isinstance(result, Group):
+                self.assertTrue(Group.objects.filter(pk=result.pk).exists())
+
+    def test_queued_write_pins_request_thread(self):
+        """Запись через поток-писатель закрепляет поток запроса."""
+        routers.begin_request()
+        self.addCleanup(routers.end_request)
+        write_queue.submit(lambda: create_group('pinned'))
+        self.assertTrue(routers.has_written())
+
+    @override_settings(DATABASE_REPLICAS=('default',))
+    def test_follow_sets_primary_cookie(self):
+        """После подписки через очередь чтение идет с основной базы."""
+        user = User.objects.create(username='reader')
+        User.objects.create(username='auth')
+        client = Client()
+        client.force_login(user)
+        response = client.get(
+            reverse('posts:profile_follow', args=('auth',))
+        )
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+        self.assertTrue(Follow.objects.filter(user=user).exists())
+
+    @override_settings(WRITE_QUEUE_WINDOW_MS=0)
+    def test_enqueued_write_in_background(self):
+        """Фоновая запись уходит писателю и при выключенной очереди,
+        а из транзакции — только после ее коммита."""
+        threads = []
+        done = threading.Event()
+
+        def background():
+            threads.append(threading.current_thread().name)
+            done.set()
+
+        with mock.patch.object(
+            connection, 'is_in_memory_db', return_value=False
+        ):
+            with transaction.atomic():
+                write_queue.enqueue(background)
+                self.assertEqual(threads, [])
+            self.assertTrue(done.wait(5))
+        self.assertEqual(threads, ['write-queue'])
+
+    def test_enqueued_error_logged(self):
+        """Ошибка фоновой записи пишется в лог, а не в запрос."""
+        def broken():
+            raise IntegrityError('broken')
+
+        with self.assertLogs('core.db.batching', 'ERROR') as logs:
+            write_queue.enqueue(broken)
+        self.assertIn('broken', logs.output[0])
+        write_queue.submit(lambda: create_group('after'))
+        self.assertTrue(Group.objects.filter(slug='after').exists())
+
+    def test_timed_out_write_cancelled(self):
+        """Запись, которую писатель не успел начать, после WriteTimeout
+        не выполняется."""
+        with override_settings(WRITE_QUEUE_TIMEOUT=0):
+            with self.assertRaises(WriteTimeout):
+                write_queue.submit(lambda: create_group('late'))
+        write_queue.submit(lambda: create_group('next'))
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['next']
+        )
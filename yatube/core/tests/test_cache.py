@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.backends import COMPRESSED, TieredCache, _local_stores
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = TieredCache(self.location, {
+            'OPTIONS': {'COMPRESS_MIN_LENGTH': 100},
+        })
+        self.addCleanup(_local_stores.pop, self.location, None)
+
+    def other_process(self):
+        """Кэш другого процесса: общий L2, пустой L1."""
+        _local_stores.pop(self.location)
+        return TieredCache(self.location, {})
+
+    def test_value_shared_through_l2(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.other_process().get('key'), {'value': 1})
+
+    def test_large_value_compressed(self):
+        """Большие значения хранятся в L2 сжатыми."""
+        self.cache.set('big', 'Тестовый пост ' * 100)
+        self.cache.set('small', 'Тестовый пост')
+        rows = dict(self.cache._connection().execute(
+            'SELECT key, substr(value, 1, 1) FROM cache'
+        ))
+        self.assertEqual(rows[self.cache.make_key('big')], COMPRESSED)
+        self.assertNotEqual(rows[self.cache.make_key('small')], COMPRESSED)
+        self.assertEqual(
+            self.other_process().get('big'), 'Тестовый пост ' * 100
+        )
+
+    def test_get_many_from_both_tiers(self):
+        """get_many собирает значения из L1 и L2 одним запросом."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        other = self.other_process()
+        other.set('c', 3)
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c', 'd']), {'a': 1, 'b': 2, 'c': 3}
+        )
+
+    def test_expired_value_not_returned(self):
+        """Истекшие записи не возвращаются ни из L1, ни из L2."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+
+    def test_incr_and_delete(self):
+        """incr и delete видны другим процессам."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        other = self.other_process()
+        self.assertEqual(other.get('counter'), 3)
+        other.delete('counter')
+        self.assertIsNone(other.get('counter'))
+        with self.assertRaises(ValueError):
+            other.incr('counter')
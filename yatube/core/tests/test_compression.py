@@ -0,0 +1,101 @@
+import gzip
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware.compression import CompressionMiddleware, minify_html
+from core.storage import brotli
+
+
+@override_settings(HTML_MINIFY=True, RESPONSE_COMPRESS_MIN_LENGTH=200)
+class CompressionMiddlewareTest(SimpleTestCase):
+    html = (
+        '<html>\n  <body>\n    <p>Текст   поста</p>\n\n'
+        '    <pre>  отступ\n\n    важен</pre>\n'
+        + '    <div>блок</div>\n' * 50
+        + '  </body>\n</html>\n'
+    )
+
+    def process(self, response, encoding='gzip'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_minify_keeps_pre(self):
+        """Отступы убираются везде, кроме pre."""
+        minified = minify_html(self.html)
+        self.assertIn('<pre>  отступ\n\n    важен</pre>', minified)
+        self.assertIn('<html>\n<body>\n<p>Текст поста</p>\n', minified)
+        self.assertNotIn('\n\n<pre>', minified)
+
+    def test_gzip(self):
+        """Ответ сжат gzip, добавлен Vary, ETag стал слабым."""
+        response = HttpResponse(self.html)
+        response['ETag'] = '"abc"'
+        response = self.process(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
+        self.assertEqual(
+            gzip.decompress(response.content).decode(),
+            minify_html(self.html)
+        )
+
+    def test_brotli(self):
+        """br предпочитается gzip, если клиент принимает оба."""
+        if brotli is None:
+            self.skipTest('brotli не установлен')
+        response = self.process(HttpResponse(self.html), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(response.content).decode(),
+            minify_html(self.html)
+        )
+
+    def test_streaming(self):
+        """Потоковый ответ сжимается по частям, каждая читается сразу."""
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = [f'data: событие {number}\n\n' for number in range(3)]
+        response = self.process(StreamingHttpResponse(
+            iter(chunks), content_type='text/event-stream'
+        ))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        stream = iter(response.streaming_content)
+        for chunk in chunks:
+            self.assertEqual(
+                decompressor.decompress(next(stream)).decode(), chunk
+            )
+
+    def test_range_not_compressed(self):
+        """Ответ 206 отдается как есть: Content-Range считан по файлу."""
+        response = StreamingHttpResponse(
+            iter([self.html[:300]]), status=206, content_type='text/plain'
+        )
+        response['Content-Range'] = f'bytes 0-299/{len(self.html)}'
+        response = self.process(response)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(
+            b''.join(response.streaming_content), self.html[:300].encode()
+        )
+
+    def test_skipped(self):
+        """Короткие, уже сжатые и бинарные ответы не трогаются."""
+        short = self.process(HttpResponse('<p>коротко</p>'))
+        encoded = HttpResponse(self.html)
+        encoded['Content-Encoding'] = 'br'
+        image = HttpResponse(b'\x89PNG' * 100, content_type='image/png')
+        for response in (short, self.process(encoded), self.process(image)):
+            with self.subTest(response=response):
+                self.assertNotEqual(
+                    response.get('Content-Encoding'), 'gzip'
+                )
+        self.assertEqual(
+            self.process(HttpResponse(self.html), 'identity').content,
+            minify_html(self.html).encode()
+        )
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from core.db.sqlite import apply_pragmas
+
+
+class SqlitePragmasTest(TestCase):
+    def pragma(self, cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+    def test_connection_uses_profile(self):
+        """Новое соединение Django получает профиль SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            self.assertEqual(
+                self.pragma(cursor, 'busy_timeout'),
+                settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+            self.assertEqual(
+                self.pragma(cursor, 'cache_size'),
+                settings.SQLITE_PRAGMAS['cache_size']
+            )
+
+    def test_file_database_switches_to_wal(self):
+        """Файловая база переводится в WAL с synchronous=NORMAL."""
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(os.path.join(directory, 'db.sqlite3'))
+            cursor = conn.cursor()
+            apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+            self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+            # 1 == NORMAL
+            self.assertEqual(self.pragma(cursor, 'synchronous'), 1)
+            conn.close()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+from django.test import Client, TestCase, override_settings
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ServeMediaTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name in ('posts/small.gif', 'cache/ab/cd/thumb.jpg'):
+            path = os.path.join(directory.name, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+        self.client = Client()
+
+    def test_full_file(self):
+        """Файл отдается целиком с ETag и заголовками кэширования."""
+        response = self.client.get('/media/posts/small.gif')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            '/media/posts/small.gif', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/media/cache/ab/cd/thumb.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range(self):
+        """Range отдает один отрезок файла, неудовлетворимый — 416."""
+        response = self.client.get(
+            '/media/posts/small.gif', HTTP_RANGE='bytes=10-19'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(CONTENT)}'
+        )
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        response = self.client.get(
+            '/media/posts/small.gif', HTTP_RANGE='bytes=-16'
+        )
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-16:])
+        response = self.client.get(
+            '/media/posts/small.gif', HTTP_RANGE='bytes=5000-'
+        )
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get(
+            '/media/posts/small.gif',
+            HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_traversal(self):
+        """Несуществующий файл и выход за MEDIA_ROOT дают 404."""
+        for url in (
+            '/media/posts/none.gif', '/media/posts/..%2F..%2Fmanage.py'
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        """С MEDIA_ACCEL_REDIRECT файл отправляет nginx."""
+        response = self.client.get('/media/posts/small.gif')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/small.gif'
+        )
+        self.assertEqual(response.content, b'')
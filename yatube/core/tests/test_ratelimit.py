@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache.ratelimit import take
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TokenBucketTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bucket(self):
+        """Корзина отдает tokens запросов, затем называет время ожидания."""
+        for _ in range(3):
+            self.assertEqual(take('bucket', 3, 60), 0)
+        self.assertEqual(take('bucket', 3, 60), 20)
+        self.assertEqual(take('other', 3, 60), 0)
+
+    def test_refill(self):
+        """Отклоненный запрос не тратит токен, корзина пополняется."""
+        for _ in range(4):
+            take('bucket', 2, 60)
+        # прошло 30 секунд — вернулся один токен
+        cache.decr('bucket', 30 * 1000)
+        self.assertEqual(take('bucket', 2, 60), 0)
+        self.assertEqual(take('bucket', 2, 60), 30)
+
+    def test_one_transaction_per_request(self):
+        """Разрешенный и отклоненный запросы — по одной транзакции L2."""
+        backend = caches['default']
+        transaction = backend._transaction
+        with mock.patch.object(
+            backend, '_transaction', side_effect=transaction
+        ) as counted:
+            self.assertEqual(take('bucket', 1, 60), 0)
+            self.assertEqual(take('bucket', 1, 60), 60)
+        self.assertEqual(counted.call_count, 2)
+
+    def test_cache_without_update(self):
+        """С обычным кэшем корзина работает через incr и touch."""
+        local = LocMemCache('ratelimit', {})
+        for _ in range(3):
+            self.assertEqual(take('bucket', 3, 60, cache=local), 0)
+        self.assertEqual(take('bucket', 3, 60, cache=local), 20)
+
+
+@override_settings(
+    RATE_LIMITS={'posts:add_comment': (2, 60, ('POST',))},
+    RATE_LIMIT_DEEP_PAGE=2,
+    RATE_LIMIT_DEEP_PAGES={'posts:index': (1, 60)},
+)
+class RateLimitMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comments(self):
+        """Третий комментарий за минуту получает 429 и Retry-After."""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for _ in range(2):
+            response = self.client.post(url, {'text': 'Комментарий'})
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # у другого пользователя своя корзина
+        other = Client()
+        other.force_login(self.other)
+        response = other.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_deep_pages(self):
+        """Глубокие страницы ограничены только для анонимов."""
+        guest = Client()
+        for page in (1, 2, 1, 2):
+            with self.subTest(page=page):
+                response = guest.get('/', {'page': page})
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(guest.get('/', {'page': 3}).status_code, 200)
+        self.assertEqual(guest.get('/', {'page': 4}).status_code, 429)
+        for _ in range(2):
+            response = self.client.get('/', {'page': 4})
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.db import routers
+from core.middleware.replicas import ReplicaMiddleware
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=('replica',))
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.addCleanup(routers.end_request)
+
+    def test_read_only_view_reads_from_replica(self):
+        """В read-only представлении чтение идет на реплику."""
+        routers.begin_request(read_only=True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_pinned_user_reads_from_primary(self):
+        """Закрепленный пользователь читает с основной базы."""
+        routers.begin_request(read_only=True, pinned=True)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_sessions_always_on_primary(self):
+        """Сессии не читаются с реплик."""
+        routers.begin_request(read_only=True)
+        self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_write_view_pins_user(self):
+        """После подписки пользователь получает cookie закрепления."""
+        author = User.objects.create(username='auth')
+        user = User.objects.create(username='HasNoName')
+        client = Client()
+        client.force_login(user)
+        response = client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        )
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
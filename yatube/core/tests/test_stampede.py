@@ -0,0 +1,78 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase
+
+from core.cache.stampede import cached_view, get_or_recompute
+
+
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'значение {self.calls}'
+
+    def expire(self, key):
+        value, soft_expires, delta = cache.get(key)
+        cache.set(key, (value, time.time() - 1, delta))
+
+    def test_fresh_value_computed_once(self):
+        """Свежее значение не пересчитывается."""
+        for _ in range(3):
+            value = get_or_recompute('key', self.compute, 20)
+        self.assertEqual(value, 'значение 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдается старое значение."""
+        get_or_recompute('key', self.compute, 20)
+        self.expire('key')
+        cache.add('key:lock', True)
+        self.assertEqual(
+            get_or_recompute('key', self.compute, 20), 'значение 1'
+        )
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_recomputed_by_lock_holder(self):
+        """Устаревшее значение пересчитывает взявший блокировку."""
+        get_or_recompute('key', self.compute, 20)
+        self.expire('key')
+        self.assertEqual(
+            get_or_recompute('key', self.compute, 20), 'значение 2'
+        )
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_early_refresh_before_expiry(self):
+        """Дорогое значение может обновиться до истечения срока."""
+        cache.set('key', ('значение 0', time.time() + 5, 10.0))
+        with mock.patch('random.random', return_value=0.9):
+            self.assertEqual(
+                get_or_recompute('key', self.compute, 20), 'значение 1'
+            )
+
+    def test_template_tag(self):
+        """Тег {% cache %} библиотеки stampede_cache кэширует фрагмент."""
+        template = Template(
+            '{% load stampede_cache %}'
+            '{% cache 20 fragment %}{{ value }}{% endcache %}'
+        )
+        self.assertEqual(template.render(Context({'value': 1})), '1')
+        self.assertEqual(template.render(Context({'value': 2})), '1')
+
+    def test_cached_view(self):
+        """Декоратор кэширует успешные ответы представления."""
+        @cached_view(20)
+        def view(request):
+            return HttpResponse(self.compute())
+
+        request = RequestFactory().get('/')
+        view(request)
+        response = view(request)
+        self.assertEqual(response.content.decode(), 'значение 1')
+        self.assertEqual(self.calls, 1)
@@ -0,0 +1,72 @@
+import gzip
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import Client, TestCase, override_settings
+
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.settings = override_settings(STATIC_ROOT=cls.directory.name)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_hashed_urls(self):
+        """{% static %} и иконки в base.html указывают на имена с хешем."""
+        self.assertRegex(
+            static('css/bootstrap.min.css'),
+            r'^/static/css/bootstrap\.min\.[0-9a-f]{12}\.css$'
+        )
+        html = self.client.get('/').content.decode()
+        for name in ('favicon-16x16', 'favicon-32x32', 'apple-touch-icon'):
+            self.assertRegex(
+                html, rf'/static/img/fav/{name}\.[0-9a-f]{{12}}\.png'
+            )
+
+    def test_precompressed_immutable(self):
+        """Сжатая копия выбирается по Accept-Encoding, файл с хешем
+        кэшируется навсегда."""
+        url = static('css/bootstrap.min.css')
+        path = os.path.join(settings.BASE_DIR, 'static/css/bootstrap.min.css')
+        with open(path, 'rb') as original:
+            content = original.read()
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), content
+        )
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+    def test_traversal_falls_through(self):
+        """Путь за пределы STATIC_ROOT не отдается и не роняет запрос."""
+        response = self.client.get('/static/%2E%2E/%2E%2E/manage.py')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unhashed_name_short_cache(self):
+        """Файл без хеша в имени кэшируется на STATIC_MAX_AGE."""
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
@@ -1,4 +1,16 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
 
 
 def page_not_found(request, exception):
@@ -15,3 +27,135 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+class _RangeFile:
+    """Отрезок файла для FileResponse: read() не выходит за length."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, end) из заголовка Range или None, если его нет или в нем
+    несколько отрезков; ValueError для неудовлетворимого диапазона."""
+    units, _, ranges = header.partition('=')
+    if units.strip() != 'bytes' or ',' in ranges:
+        return None
+    start, _, end = (part.strip() for part in ranges.partition('-'))
+    if (start and not start.isdigit()) or (end and not end.isdigit()):
+        # некорректный Range игнорируется, отдается весь файл
+        return None
+    if not start:
+        # bytes=-500: последние 500 байт
+        if not end or int(end) == 0:
+            raise ValueError(header)
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _media_headers(path, stat, etag):
+    if path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+    return {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+
+
+def _not_modified(request, stat, etag):
+    """Условный GET: If-None-Match главнее If-Modified-Since."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in if_none_match
+    return not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        stat.st_mtime, stat.st_size,
+    )
+
+
+def _accel_response(path, content_type):
+    # Range и отправку файла берет на себя nginx
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(path)
+    return response
+
+
+def _file_response(request, full_path, stat, etag, content_type):
+    """Файл целиком, отрезок из Range (206) или 416."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' not in request.META or if_range and if_range != etag:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    try:
+        start, end = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    response = FileResponse(
+        _RangeFile(open(full_path, 'rb'), start, end - start + 1),
+        content_type=content_type,
+        status=206,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def serve_media(request, path):
+    """Загруженные файлы из MEDIA_ROOT.
+
+    Полный файл отдается через FileResponse, и WSGI-сервер с
+    wsgi.file_wrapper отправляет его sendfile без копирования в Python.
+    Поддерживаются Range (один отрезок), ETag/If-None-Match,
+    If-Modified-Since и долгое кэширование. Если задан
+    MEDIA_ACCEL_REDIRECT, файл отдает фронтовый nginx по
+    X-Accel-Redirect, а Django только проверяет запрос.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    headers = _media_headers(path, stat, etag)
+    if _not_modified(request, stat, etag):
+        response = HttpResponseNotModified()
+    else:
+        content_type, encoding = mimetypes.guess_type(full_path)
+        content_type = content_type or 'application/octet-stream'
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = _accel_response(path, content_type)
+        else:
+            response = _file_response(
+                request, full_path, stat, etag, content_type
+            )
+        if response.status_code == 416:
+            return response
+        if encoding:
+            response['Content-Encoding'] = encoding
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -1,6 +1,50 @@
 from django.contrib import admin
+from django.db import models
 
-from posts.models import Post, Group, Comment, Follow
+from core.paginator import EstimatedCountPaginator
+from posts.deletion import schedule_deletion
+from posts.models import Post, Group, Comment, Follow, DeletionTask
+
+
+def cascaded_models(model):
+    """Модели, строки которых удаляются каскадом вместе с model."""
+    found = set()
+    pending = [model]
+    while pending:
+        for relation in pending.pop()._meta.related_objects:
+            related = relation.related_model
+            if relation.on_delete is models.CASCADE and related not in found:
+                found.add(related)
+                pending.append(related)
+    return found
+
+
+class BackgroundDeletionAdmin(admin.ModelAdmin):
+    """Удаление (одиночное и массовое) ставится в очередь
+    process_deletions вместо каскада в одной транзакции."""
+
+    def get_deleted_objects(self, objs, request):
+        # не собираем весь каскад ради страницы подтверждения, но права
+        # проверяем, как Django: на каждую модель в каскаде, которая
+        # есть в админке, нужно право удаления
+        deleted_objects = [
+            f'{obj} (будет удален в фоне)' for obj in objs
+        ]
+        perms_needed = set()
+        for model in cascaded_models(self.model):
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin and not model_admin.has_delete_permission(
+                request
+            ):
+                perms_needed.add(model._meta.verbose_name)
+        return deleted_objects, {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,12 +56,17 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeletionAdmin):
     list_display = (
         'pk',
         'title',
@@ -35,8 +84,14 @@ class CommentAdmin(admin.ModelAdmin):
         'created',
     )
     list_editable = ('text',)
-    search_fields = ('author',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    search_fields = ('=author__username',)
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class FollowAdmin(admin.ModelAdmin):
@@ -44,11 +99,45 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
-    search_fields = ('user',)
-    list_filter = ('author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        '__str__',
+        'status',
+        'processed',
+        'total',
+        'progress',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind',
+        'object_id',
+        'title',
+        'status',
+        'total',
+        'processed',
+        'created',
+        'finished',
+    )
+
+    def progress(self, obj):
+        return f'{obj.progress}%'
+    progress.short_description = 'Прогресс'
+
+    def has_add_permission(self, request):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(DeletionTask, DeletionTaskAdmin)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Статья(Пост)'
+
+    def ready(self):
+        from posts import signals
+        signals.connect_signals()
@@ -0,0 +1,113 @@
+"""
+Холодное хранение старых постов.
+
+Команда archive_posts переносит посты старше ARCHIVE_AFTER_DAYS дней
+вместе с комментариями в таблицы ArchivedPost и ArchivedComment,
+так что горячие таблицы и их индексы остаются небольшими. id постов
+сохраняются, поэтому страницы поста, профиля и группы находят
+архивные записи через fallback: сначала горячая таблица, потом архив.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from posts import sharding
+from posts.deletion import visible
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+def _copy(instance, model):
+    return model(**{
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields
+    })
+
+
+def archive(days=None, batch_size=500, report=None):
+    """Переносит старые посты пачками; возвращает число перенесенных."""
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    moved = 0
+    old = Post.objects.filter(pub_date__lt=cutoff).order_by('pub_date')
+    for shard in sharding.per_shard(old):
+        db = shard.db
+        while True:
+            ids = list(shard.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # архивные строки коммитятся в default раньше, чем посты
+            # удаляются из шарда: сбой между коммитами оставит копию в
+            # обеих таблицах, а повтор пропустит уже архивированные id
+            with transaction.atomic(using=db):
+                posts = Post.objects.using(db).filter(pk__in=ids)
+                comments = Comment.objects.using(db).filter(post_id__in=ids)
+                with transaction.atomic():
+                    ArchivedPost.objects.using('default').bulk_create(
+                        (_copy(post, ArchivedPost) for post in posts),
+                        ignore_conflicts=True,
+                    )
+                    ArchivedComment.objects.using('default').bulk_create(
+                        (
+                            _copy(comment, ArchivedComment)
+                            for comment in comments
+                        ),
+                        ignore_conflicts=True,
+                    )
+                comments.delete()
+                posts.delete()
+            moved += len(ids)
+            if report is not None:
+                report(moved)
+    return moved
+
+
+def get_post_or_404(post_id):
+    """Пост из горячей таблицы или, если его там нет, из архива."""
+    post = sharding.find(visible(Post.objects.all()), pk=post_id)
+    if post is None:
+        post = visible(ArchivedPost.objects.all()).filter(pk=post_id).first()
+    if post is None:
+        raise Http404('Пост не найден')
+    return post
+
+
+class ArchiveChain:
+    """Горячие посты, за ними архивные — для Paginator.
+
+    Архивируются только посты старше горячих, так что при одинаковой
+    сортировке по дате склейка сохраняет общий порядок.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._hot_count = None
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._hot_count = self.hot.count()
+            self._count = self._hot_count + self.archived.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        self.count()
+        start = key.start or 0
+        stop = self._count if key.stop is None else key.stop
+        items = []
+        if start < self._hot_count:
+            items.extend(self.hot[start:min(stop, self._hot_count)])
+        if stop > self._hot_count:
+            items.extend(self.archived[
+                max(start - self._hot_count, 0):stop - self._hot_count
+            ])
+        return items
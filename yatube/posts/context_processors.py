@@ -0,0 +1,11 @@
+from posts import notifications
+
+
+def unread_notifications(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # шаблон вызовет функцию, только если выводит счетчик
+    return {
+        'unread_notifications': lambda: notifications.unread_count(user.pk)
+    }
@@ -0,0 +1,149 @@
+"""
+Фоновое удаление пользователей и групп с большим количеством контента.
+
+schedule_deletion() сразу скрывает объект (пользователь блокируется,
+его посты и комментарии пропадают из лент, страница группы отдает 404)
+и ставит задачу в очередь. Команда process_deletions выполняет задачи
+пачками по batch_size строк, каждую пачку в своей транзакции, так что
+база не блокируется надолго, а в память не собирается весь каскад.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from posts import sharding
+from posts.models import (
+    ArchivedComment, ArchivedPost, Comment, DeletionTask, Follow, Group,
+    Notification, Post, User,
+)
+
+
+HIDDEN_KEY = 'deletion:hidden'
+HIDDEN_TIMEOUT = 60
+
+
+def hidden():
+    """(id пользователей, id групп), ожидающих удаления."""
+    value = cache.get(HIDDEN_KEY)
+    if value is None:
+        users, groups = set(), set()
+        tasks = DeletionTask.objects.exclude(
+            status=DeletionTask.DONE
+        ).values_list('kind', 'object_id')
+        for kind, object_id in tasks:
+            if kind == DeletionTask.USER:
+                users.add(object_id)
+            else:
+                groups.add(object_id)
+        value = (frozenset(users), frozenset(groups))
+        cache.set(HIDDEN_KEY, value, HIDDEN_TIMEOUT)
+    return value
+
+
+def hidden_users():
+    return hidden()[0]
+
+
+def hidden_groups():
+    return hidden()[1]
+
+
+def visible(queryset):
+    """Посты или комментарии без авторов, ожидающих удаления."""
+    users = hidden_users()
+    if users:
+        return queryset.exclude(author_id__in=users)
+    return queryset
+
+
+def schedule_deletion(obj):
+    """Скрывает пользователя или группу и ставит удаление в очередь."""
+    if isinstance(obj, Group):
+        kind = DeletionTask.GROUP
+        title = obj.title
+    else:
+        kind = DeletionTask.USER
+        title = obj.username
+        obj.is_active = False
+        obj.save(update_fields=('is_active',))
+    task = DeletionTask.objects.exclude(status=DeletionTask.DONE).filter(
+        kind=kind, object_id=obj.pk
+    ).first()
+    if task is None:
+        task = DeletionTask.objects.create(
+            kind=kind, object_id=obj.pk, title=title
+        )
+    cache.delete(HIDDEN_KEY)
+    return task
+
+
+def _steps(task):
+    """Шаги задачи: (действие, queryset строк)."""
+    pk = task.object_id
+    if task.kind == DeletionTask.GROUP:
+        return (
+            *(
+                ('unlink', posts) for posts in
+                sharding.per_shard(Post.objects.filter(group_id=pk))
+            ),
+            ('unlink', ArchivedPost.objects.filter(group_id=pk)),
+        )
+    return (
+        *(
+            ('delete', comments) for comments in
+            sharding.per_shard(Comment.objects.filter(author_id=pk))
+        ),
+        ('delete', Comment.objects.using(sharding.shard_for(pk)).filter(
+            post__author_id=pk
+        )),
+        ('delete', Follow.objects.filter(user_id=pk)),
+        ('delete', Follow.objects.filter(author_id=pk)),
+        ('delete', Notification.objects.filter(author_id=pk)),
+        ('delete', Notification.objects.filter(user_id=pk)),
+        ('delete', Post.objects.using(sharding.shard_for(pk)).filter(
+            author_id=pk
+        )),
+        ('delete', ArchivedComment.objects.filter(author_id=pk)),
+        ('delete', ArchivedComment.objects.filter(post__author_id=pk)),
+        ('delete', ArchivedPost.objects.filter(author_id=pk)),
+    )
+
+
+def _target(task):
+    if task.kind == DeletionTask.GROUP:
+        return Group.objects.filter(pk=task.object_id)
+    return User.objects.filter(pk=task.object_id)
+
+
+def process(task, batch_size, report=None):
+    """Выполняет задачу пачками; report(task) вызывается после каждой."""
+    steps = _steps(task)
+    if task.status == DeletionTask.PENDING:
+        task.total = sum(queryset.count() for _, queryset in steps)
+        task.status = DeletionTask.RUNNING
+        task.save(update_fields=('total', 'status'))
+    for action, queryset in steps:
+        model, db = queryset.model, queryset.db
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic(using=db):
+                batch = model.objects.using(db).filter(pk__in=ids)
+                if action == 'unlink':
+                    # новое время изменения сбрасывает карточки в кэше
+                    batch.update(group=None, updated=timezone.now())
+                else:
+                    batch.delete()
+            task.processed += len(ids)
+            task.save(update_fields=('processed',))
+            if report is not None:
+                report(task)
+    with transaction.atomic():
+        _target(task).delete()
+        task.status = DeletionTask.DONE
+        task.finished = timezone.now()
+        task.save(update_fields=('status', 'finished'))
+    cache.delete(HIDDEN_KEY)
+    if report is not None:
+        report(task)
@@ -0,0 +1,145 @@
+"""
+Еженедельная рассылка новых постов авторов из подписок.
+
+Вместо запроса ленты подписок на каждого пользователя рассылка
+проходит таблицы по одному разу:
+1. посты за период (со всех шардов) пачками по (pub_date, id)
+   раскладываются по авторам — это единственное, что держится в
+   памяти целиком;
+2. подписки пачками по (user_id, author_id) и пользователи пачками
+   по id идут навстречу друг другу, как при слиянии двух
+   отсортированных списков: для каждого подписчика его авторы
+   встречаются подряд, а его строка User — ровно в этот момент;
+3. посты авторов подписчика сливаются по дате через heapq.merge,
+   письма собираются из фрагментов постов и уходят пачками по
+   DIGEST_BATCH_SIZE через одно соединение с почтой.
+
+Фрагмент поста рендерится один раз на всю рассылку, а не в каждом
+письме: пост популярного автора попадает в тысячи писем, и рендер
+шаблона на каждый пост в каждом письме был главной статьей расходов.
+"""
+import heapq
+from collections import namedtuple
+from datetime import timedelta
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.core import mail
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from core.paginator import walk
+from posts import sharding
+from posts.deletion import visible
+from posts.models import Follow, Post, User
+
+
+DigestPost = namedtuple('DigestPost', 'pub_date text')
+
+# больше параметров в одном запросе SQLite не примет
+MAX_IN_AUTHORS = 900
+
+
+def recent_posts(since, chunk_size):
+    """{author_id: [DigestPost, ...]} по убыванию даты; text — готовый
+    фрагмент письма."""
+    by_author = {}
+    queryset = visible(Post.objects.filter(pub_date__gte=since))
+    for shard in sharding.per_shard(queryset):
+        rows = walk(
+            shard, ('pub_date', 'id'), ('author_id', 'text'), chunk_size
+        )
+        for pub_date, post_id, author_id, text in rows:
+            by_author.setdefault(author_id, []).append((
+                pub_date, post_id, text[:settings.DIGEST_TEXT_LENGTH]
+            ))
+    authors = list(by_author)
+    names = {}
+    for start in range(0, len(authors), MAX_IN_AUTHORS):
+        names.update(User.objects.filter(
+            pk__in=authors[start:start + MAX_IN_AUTHORS]
+        ).values_list('pk', 'username'))
+    site = settings.SITE_URL.rstrip('/')
+    template = get_template('posts/email/digest_post.txt')
+    result = {}
+    for author_id, posts in by_author.items():
+        posts.sort(reverse=True)
+        result[author_id] = [
+            DigestPost(pub_date, template.render({
+                'author': names.get(author_id, ''),
+                'pub_date': pub_date,
+                'text': text,
+                'url': site + reverse('posts:post_detail', args=(post_id,)),
+            }))
+            for pub_date, post_id, text in posts
+        ]
+    return result
+
+
+def digests(since, max_posts, chunk_size):
+    """(id, username, email), посты и их общее число для каждого
+    подписчика, у авторов которого есть новые посты."""
+    posts = recent_posts(since, chunk_size)
+    if not posts:
+        return
+    follows = walk(
+        Follow.objects.all(), ('user_id', 'author_id'), (), chunk_size
+    )
+    users = iter(walk(
+        User.objects.filter(is_active=True).exclude(email=''),
+        ('id',), ('username', 'email'), chunk_size,
+    ))
+    user = next(users, None)
+    for user_id, rows in groupby(follows, key=itemgetter(0)):
+        lists = [posts[author] for _, author in rows if author in posts]
+        if not lists:
+            continue
+        while user is not None and user[0] < user_id:
+            user = next(users, None)
+        if user is None:
+            return
+        if user[0] != user_id:
+            continue
+        merged = heapq.merge(
+            *lists, key=attrgetter('pub_date'), reverse=True
+        )
+        yield user, list(islice(merged, max_posts)), sum(map(len, lists))
+
+
+def send(days=None, batch_size=None, chunk_size=None, report=None):
+    """Рассылает дайджест за days дней; возвращает число писем."""
+    days = days or settings.DIGEST_DAYS
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    chunk_size = chunk_size or settings.DIGEST_CHUNK_SIZE
+    since = timezone.now() - timedelta(days=days)
+    template = get_template('posts/email/digest.txt')
+    follow_url = settings.SITE_URL.rstrip('/') + reverse(
+        'posts:follow_index'
+    )
+    sent = 0
+    batch = []
+    with mail.get_connection() as connection:
+        for (user_id, username, email), posts, total in digests(
+            since, settings.DIGEST_MAX_POSTS, chunk_size
+        ):
+            body = template.render({
+                'username': username,
+                'days': days,
+                'posts': [post.text for post in posts],
+                'more': total - len(posts),
+                'follow_url': follow_url,
+            })
+            batch.append(mail.EmailMessage(
+                settings.DIGEST_SUBJECT, body, to=[email],
+                connection=connection,
+            ))
+            if len(batch) >= batch_size:
+                sent += connection.send_messages(batch) or 0
+                batch = []
+                if report:
+                    report(sent)
+        if batch:
+            sent += connection.send_messages(batch) or 0
+    return sent
@@ -0,0 +1,237 @@
+"""
+Компактный граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id
+(array('q')): на кого он подписан и кто подписан на него. Граф
+загружается при первом обращении и обновляется по сигналам Follow.
+
+Согласованность:
+- изменение, сделанное внутри транзакции, применяется к графу
+  процесса сразу, а версия в кэше растет только после коммита; если
+  транзакция откатится, граф это заметит при следующем обращении и
+  перезагрузится;
+- другие процессы узнают об изменениях по версии графа в кэше
+  FOLLOW_GRAPH_CACHE_ALIAS и перезагружают его лениво; у этого кэша
+  нет L1, иначе процесс до L1_TIMEOUT видел бы свою старую версию;
+- раз в FOLLOW_GRAPH_TTL секунд граф перечитывается целиком, чтобы
+  подхватить изменения в обход сигналов (bulk_create, сырой SQL).
+"""
+import time
+from array import array
+from bisect import bisect_left
+from threading import RLock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from posts.models import Follow
+
+
+VERSION_KEY = 'follow_graph:version'
+
+EMPTY = array('q')
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def _insert(index, key, value):
+    ids = index.setdefault(key, array('q'))
+    position = bisect_left(ids, value)
+    if position == len(ids) or ids[position] != value:
+        ids.insert(position, value)
+
+
+def _remove(index, key, value):
+    ids = index.get(key)
+    if ids is None:
+        return
+    position = bisect_left(ids, value)
+    if position < len(ids) and ids[position] == value:
+        del ids[position]
+        if not ids:
+            del index[key]
+
+
+def intersect(left, right):
+    """Пересечение двух отсортированных массивов за O(n + m)."""
+    result = array('q')
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] == right[j]:
+            result.append(left[i])
+            i += 1
+            j += 1
+        elif left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class _PendingChange:
+    """Отметка изменения, сделанного внутри еще не закрытой транзакции."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.committed = False
+
+    def __call__(self):
+        self.committed = True
+
+    def rolled_back(self):
+        # при откате Django выбрасывает колбэки on_commit этой транзакции
+        return not self.committed and all(
+            func is not self for _, func in self.connection.run_on_commit
+        )
+
+
+class FollowGraph:
+    def __init__(self):
+        self._lock = RLock()
+        self._following = {}
+        self._followers = {}
+        self._loaded_at = None
+        self._version = None
+        self._pending = []
+
+    # загрузка и согласованность
+
+    def reset(self):
+        with self._lock:
+            self._loaded_at = None
+            self._pending = []
+
+    def _shared_version(self):
+        cache = caches[settings.FOLLOW_GRAPH_CACHE_ALIAS]
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 0, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _load(self):
+        following = {}
+        followers = {}
+        # только основная база: граф с отстающей реплики запомнился бы
+        # под свежей версией
+        rows = Follow.objects.using('default').order_by(
+            'user_id', 'author_id'
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in rows.iterator():
+            following.setdefault(user_id, array('q')).append(author_id)
+            # строки идут по возрастанию user_id, массивы подписчиков
+            # получаются отсортированными без дополнительной работы
+            followers.setdefault(author_id, array('q')).append(user_id)
+        self._following = following
+        self._followers = followers
+        self._pending = []
+        self._loaded_at = time.monotonic()
+
+    def _is_current(self, version):
+        return (
+            self._loaded_at is not None
+            and version == self._version
+            and time.monotonic() - self._loaded_at < settings.FOLLOW_GRAPH_TTL
+        )
+
+    def _ensure_loaded(self):
+        if self._pending:
+            self._check_pending()
+        version = self._shared_version()
+        if self._is_current(version):
+            return
+        with self._lock:
+            # пока ждали блокировку, граф мог перечитать другой поток
+            if self._is_current(version):
+                return
+            self._version = version
+            self._load()
+
+    def _check_pending(self):
+        with self._lock:
+            pending = []
+            for change in self._pending:
+                if change.rolled_back():
+                    self._loaded_at = None
+                    return
+                if not change.committed:
+                    pending.append(change)
+            self._pending = pending
+
+    def _changed(self, using):
+        connection = transaction.get_connection(using)
+        if connection.in_atomic_block:
+            change = _PendingChange(connection)
+            self._pending.append(change)
+            transaction.on_commit(change, using=using)
+        # другие процессы перечитают граф по новой версии, поэтому она
+        # растет только после коммита подписки; без транзакции сразу
+        transaction.on_commit(self._bump_version, using=using)
+
+    def _bump_version(self):
+        with self._lock:
+            try:
+                version = caches[settings.FOLLOW_GRAPH_CACHE_ALIAS].incr(
+                    VERSION_KEY
+                )
+            except ValueError:
+                self._loaded_at = None
+                return
+            if self._loaded_at is not None and version == self._version + 1:
+                # кроме нас граф никто не менял, перезагрузка не нужна
+                self._version = version
+            else:
+                self._loaded_at = None
+
+    # обновление по сигналам
+
+    def add(self, user_id, author_id, using='default'):
+        with self._lock:
+            if self._loaded_at is not None:
+                _insert(self._following, user_id, author_id)
+                _insert(self._followers, author_id, user_id)
+            self._changed(using)
+
+    def remove(self, user_id, author_id, using='default'):
+        with self._lock:
+            if self._loaded_at is not None:
+                _remove(self._following, user_id, author_id)
+                _remove(self._followers, author_id, user_id)
+            self._changed(using)
+
+    # запросы
+
+    def is_following(self, user_id, author_id):
+        self._ensure_loaded()
+        return _contains(self._following.get(user_id, EMPTY), author_id)
+
+    def following(self, user_id):
+        """Отсортированные id авторов, на которых подписан пользователь."""
+        self._ensure_loaded()
+        return self._following.get(user_id, EMPTY)
+
+    def followers(self, author_id):
+        """Отсортированные id подписчиков автора."""
+        self._ensure_loaded()
+        return self._followers.get(author_id, EMPTY)
+
+    def following_count(self, user_id):
+        return len(self.following(user_id))
+
+    def followers_count(self, author_id):
+        return len(self.followers(author_id))
+
+    def common_following(self, user_id, other_id):
+        """Авторы, на которых подписаны оба пользователя."""
+        return intersect(self.following(user_id), self.following(other_id))
+
+    def common_followers(self, author_id, other_id):
+        """Пользователи, подписанные на обоих авторов."""
+        return intersect(self.followers(author_id), self.followers(other_id))
+
+
+follow_graph = FollowGraph()
@@ -1,6 +1,19 @@
 from django import forms
 
-from posts.models import Post, Comment
+from posts import spam
+from posts.models import Comment, Fingerprint, Post
+
+
+SPAM_ERROR = 'Такой текст уже публиковали несколько раз, похоже на спам'
+
+
+def check_spam(form, kind, text):
+    # отпечаток сохраняется вместе с объектом, сигнал post_save
+    # запишет его ключи в Fingerprint
+    simhash = spam.fingerprint(text)
+    if spam.is_spam(kind, simhash, exclude=form.instance.pk):
+        raise forms.ValidationError(SPAM_ERROR)
+    form.instance.simhash = simhash
 
 
 class PostForm(forms.ModelForm):
@@ -11,6 +24,7 @@ class PostForm(forms.ModelForm):
     def clean_text(self):
         data = self.cleaned_data['text']
         if not data == '':
+            check_spam(self, Fingerprint.POST, data)
             return data
         raise forms.ValidationError('Поле необходимо заполнить')
 
@@ -23,5 +37,6 @@ class CommentForm(forms.ModelForm):
     def clean_text(self):
         data = self.cleaned_data['text']
         if not data == '':
+            check_spam(self, Fingerprint.COMMENT, data)
             return data
         raise forms.ValidationError('Поле необходимо заполнить')
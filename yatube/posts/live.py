@@ -0,0 +1,96 @@
+"""
+Живое обновление лент через Server-Sent Events.
+
+После коммита нового поста сигнал публикует его id в каналы
+core.pubsub: общий "posts", "group:<id>" и "author:<id>". Поток SSE
+подписан на каналы своей ленты (главная, группа или авторы из
+подписок) и отправляет событие posts с числом новых записей, а
+страница показывает "Новых записей: N" без перезагрузки.
+
+Каждый поток занимает поток WSGI-сервера на все время соединения,
+поэтому их не больше SSE_MAX_CONNECTIONS на процесс (по умолчанию
+четверть WSGI_THREADS) и в любом случае не больше половины
+WSGI_THREADS: сверх — сразу 503 с Retry-After, пока у обычных
+запросов еще есть свободные потоки. Живет поток не дольше
+SSE_MAX_SECONDS: браузер сам переподключается через
+SSE_RETRY_MS. Пока событий нет, раз в SSE_HEARTBEAT_SECONDS уходит
+комментарий: прокси не закрывает соединение, а отключившийся клиент
+обнаруживается на первой же записи.
+
+Подписчики видят посты, опубликованные их процессом; на несколько
+процессов нужен общий брокер вместо core.pubsub.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from core.pubsub import broker
+
+
+FEED_CHANNEL = 'posts'
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def publish_post(post):
+    message = {'id': post.pk}
+    channels = [FEED_CHANNEL, author_channel(post.author_id)]
+    if post.group_id:
+        channels.append(group_channel(post.group_id))
+
+    def publish():
+        for channel in channels:
+            broker.publish(channel, message)
+
+    # до коммита пост еще не виден тем, кто обновит страницу
+    transaction.on_commit(publish, using=post._state.db)
+
+
+def max_connections():
+    """Сколько потоков SSE может держать процесс."""
+    return min(settings.SSE_MAX_CONNECTIONS, settings.WSGI_THREADS // 2)
+
+
+def subscribe(channels):
+    """Подписка для потока; core.pubsub.Full, если потоков слишком много."""
+    return broker.subscribe(
+        channels, max_connections(), settings.SSE_MAX_PENDING
+    )
+
+
+def _event(name, data, event_id=None):
+    lines = [f'event: {name}', f'data: {json.dumps(data)}']
+    if event_id is not None:
+        lines.insert(0, f'id: {event_id}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(subscription):
+    """Тело ответа text/event-stream; подписка закрывается в конце."""
+    deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+    try:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            messages = subscription.get(
+                min(settings.SSE_HEARTBEAT_SECONDS, remaining)
+            )
+            if not messages:
+                yield ': ping\n\n'
+                continue
+            last_id = max(message['id'] for message in messages)
+            yield _event(
+                'posts', {'count': len(messages), 'last_id': last_id}, last_id
+            )
+    finally:
+        subscription.close()
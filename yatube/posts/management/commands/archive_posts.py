@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые посты вместе с комментариями '
+        'в архивные таблицы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях, по умолчанию ARCHIVE_AFTER_DAYS',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        moved = archive.archive(
+            options['days'], options['batch_size'], self.report
+        )
+        self.stdout.write(f'Перенесено в архив постов: {moved}')
+
+    def report(self, moved):
+        self.stdout.write(f'Перенесено: {moved}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает кандидатов и базовые оценки ранжированной ленты'
+
+    def handle(self, *args, **options):
+        count = len(ranking.refresh())
+        self.stdout.write(f'Кандидатов в ленте: {count}')
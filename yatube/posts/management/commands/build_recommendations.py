@@ -0,0 +1,178 @@
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, Recommendation
+
+
+# вклад рекомендаций "подписки моих подписок" и "похожие читатели"
+FRIENDS_OF_FRIENDS_WEIGHT = 1.0
+CO_FOLLOW_WEIGHT = 1.0
+# авторы с большим числом подписчиков почти ничего не говорят о
+# сходстве читателей, а раскрытие их подписчиков самое дорогое
+MAX_CO_FOLLOWERS = 1000
+
+
+class SparseRows:
+    """Разреженная матрица смежности в формате CSR на массивах NumPy."""
+
+    def __init__(self, rows, cols, size):
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self.indptr[1:])
+
+    def degree(self, rows):
+        return self.indptr[rows + 1] - self.indptr[rows]
+
+    def expand(self, rows):
+        """Для каждой строки из rows — все ее столбцы.
+
+        Возвращает (номер строки в rows, столбец) для всех ненулевых
+        элементов, без циклов на Python."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        return owner, self.indices[np.repeat(starts, lengths) + offsets]
+
+
+def aggregate(rows, cols, weights, size):
+    """Суммирует веса одинаковых пар (row, col)."""
+    keys, inverse = np.unique(rows * size + cols, return_inverse=True)
+    return keys // size, keys % size, np.bincount(inverse, weights)
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает рекомендации "на кого подписаться" по подпискам '
+        'друзей и по похожим читателям'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed', action='store_true',
+            help='Только пользователи, подписки которых изменились',
+        )
+        parser.add_argument('--users', type=int, nargs='*')
+        parser.add_argument('--top-k', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        top_k = options['top_k'] or settings.NUB_OF_SUGGESTIONS * 2
+        follows = np.array(
+            Follow.objects.values_list('user_id', 'author_id'),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        ids = np.unique(follows)
+        users = np.searchsorted(ids, follows[:, 0])
+        authors = np.searchsorted(ids, follows[:, 1])
+        self.follows = SparseRows(users, authors, len(ids))
+        self.followers = SparseRows(authors, users, len(ids))
+        self.ids = ids
+
+        targets = self.targets(options, np.unique(users))
+        done = 0
+        for start in range(0, len(targets), options['batch_size']):
+            batch = targets[start:start + options['batch_size']]
+            self.save(batch, self.compute(batch, top_k))
+            done += len(batch)
+        cleared = self.clear_unfollowing(options)
+        self.stdout.write(f'Рекомендации рассчитаны для {done} пользователей')
+        if cleared:
+            self.stdout.write(f'Удалены рекомендации {cleared} пользователей')
+
+    def targets(self, options, following_users):
+        """Плотные индексы пользователей, для которых считаем."""
+        if options['users']:
+            user_ids = np.array(options['users'], dtype=np.int64)
+        elif options['changed']:
+            done = Recommendation.objects.filter(is_stale=False).values_list(
+                'user_id', flat=True
+            )
+            user_ids = np.setdiff1d(
+                self.ids[following_users],
+                np.fromiter(done.iterator(), dtype=np.int64),
+            )
+        else:
+            return following_users
+        user_ids = user_ids[np.isin(user_ids, self.ids)]
+        return np.searchsorted(self.ids, user_ids)
+
+    def clear_unfollowing(self, options):
+        """Удаляет рекомендации тех, кто ни на кого не подписан.
+
+        В матрице подписок таких пользователей нет, и без этого их
+        строки Recommendation, в том числе устаревшие, жили бы вечно."""
+        rows = Recommendation.objects.exclude(
+            user_id__in=Follow.objects.values('user_id')
+        )
+        if options['users']:
+            rows = rows.filter(user_id__in=options['users'])
+        elif options['changed']:
+            rows = rows.filter(is_stale=True)
+        return rows.delete()[0]
+
+    def compute(self, batch, top_k):
+        """Top-K авторов для пачки пользователей: {индекс в batch: [id]}."""
+        size = len(self.ids)
+        owner, followed = self.follows.expand(batch)
+
+        # подписки моих подписок
+        step, fof = self.follows.expand(followed)
+        rows = [owner[step]]
+        cols = [fof]
+        weights = [np.full(len(fof), FRIENDS_OF_FRIENDS_WEIGHT)]
+
+        # похожие читатели: сходство по общим авторам (косинус),
+        # их подписки с весом сходства
+        informative = self.followers.degree(followed) <= MAX_CO_FOLLOWERS
+        step, readers = self.followers.expand(followed[informative])
+        reader_rows, readers, common = aggregate(
+            owner[informative][step], readers,
+            np.ones(len(readers)), size,
+        )
+        other = readers != batch[reader_rows]
+        reader_rows = reader_rows[other]
+        readers = readers[other]
+        similarity = common[other] / np.sqrt(
+            self.follows.degree(batch[reader_rows])
+            * self.follows.degree(readers)
+        )
+        step, cofollowed = self.follows.expand(readers)
+        rows.append(reader_rows[step])
+        cols.append(cofollowed)
+        weights.append(similarity[step] * CO_FOLLOW_WEIGHT)
+
+        rows, cols, scores = aggregate(
+            np.concatenate(rows), np.concatenate(cols),
+            np.concatenate(weights), size,
+        )
+        # уже подписан или это сам пользователь
+        known = np.isin(rows * size + cols, owner * size + followed)
+        keep = ~known & (cols != batch[rows])
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+
+        order = np.lexsort((-scores, rows))
+        rows, cols = rows[order], cols[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < top_k
+        result = {}
+        for row, col in zip(rows[top].tolist(), self.ids[cols[top]].tolist()):
+            result.setdefault(row, []).append(col)
+        return result
+
+    def save(self, batch, result):
+        user_ids = self.ids[batch].tolist()
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            Recommendation.objects.bulk_create(
+                Recommendation(
+                    user_id=user_id,
+                    authors=','.join(map(str, result.get(row, ()))),
+                )
+                for row, user_id in enumerate(user_ids)
+            )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import deletion
+from posts.models import DeletionTask
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновое удаление пользователей и групп пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ждать новые задачи',
+        )
+        parser.add_argument('--sleep', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = DeletionTask.objects.exclude(
+                status=DeletionTask.DONE
+            ).order_by('created')
+            for task in tasks:
+                deletion.process(task, options['batch_size'], self.report)
+            if not options['loop']:
+                return
+            time.sleep(options['sleep'])
+
+    def report(self, task):
+        self.stdout.write(
+            f'{task}: {task.processed}/{task.total} ({task.progress}%), '
+            f'{task.get_status_display().lower()}'
+        )
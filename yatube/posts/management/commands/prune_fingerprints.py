@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from posts import spam
+
+
+class Command(BaseCommand):
+    help = 'Удаляет отпечатки текстов старше SPAM_WINDOW_HOURS'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено отпечатков: {spam.prune()}')
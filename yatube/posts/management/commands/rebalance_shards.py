@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from posts import sharding
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты и комментарии в шарды их авторов '
+        'после изменения POST_SHARDS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', default=[],
+            help='Дополнительная база-источник, например выведенный шард',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        sources = {'default', *settings.POST_SHARDS, *options['source']}
+        last_id = 0
+        for source in sorted(sources):
+            authors = Post.objects.using(source).values_list(
+                'author_id', flat=True
+            ).order_by().distinct()
+            for author_id in list(authors):
+                target = sharding.shard_for(author_id)
+                if target == source:
+                    continue
+                moved = sharding.move_author(
+                    author_id, source, target, options['batch_size']
+                )
+                self.stdout.write(
+                    f'Автор {author_id}: {moved} постов {source} -> {target}'
+                )
+            for model in (Post, Comment):
+                top = model.objects.using(source).aggregate(
+                    top=Max('pk')
+                )['top']
+                last_id = max(last_id, top or 0)
+        if sharding.is_sharded() and last_id:
+            sharding.reserve(last_id)
+        self.stdout.write('Шарды сбалансированы')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет устаревшие интервалы счетчиков популярности '
+        'и пересчитывает популярные посты и группы'
+    )
+
+    def handle(self, *args, **options):
+        trending.refresh()
+        self.stdout.write('Популярное пересчитано')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts import markup, sharding
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает HTML текста постов и комментариев, '
+        'сохраненный прошлой версией рендерера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment, ArchivedPost, ArchivedComment):
+            total = 0
+            stale = model.objects.filter(
+                text_html_version__lt=markup.VERSION
+            ).order_by('pk').only('pk', 'text')
+            if model in (Post, Comment):
+                querysets = sharding.per_shard(stale)
+            else:
+                querysets = [stale]
+            for queryset in querysets:
+                total += self.render(queryset, options['batch_size'])
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обновлено {total}'
+            )
+
+    def render(self, queryset, batch_size):
+        done = 0
+        while True:
+            batch = list(queryset[:batch_size])
+            if not batch:
+                return done
+            for obj in batch:
+                obj.text_html = markup.render(obj.text)
+                obj.text_html_version = markup.VERSION
+            queryset.model.objects.using(queryset.db).bulk_update(
+                batch, ('text_html', 'text_html_version')
+            )
+            done += len(batch)
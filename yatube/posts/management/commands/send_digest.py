@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает подписчикам письма с новыми записями их авторов '
+        'за последние дни'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='За сколько дней брать посты, по умолчанию DIGEST_DAYS',
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        sent = digest.send(
+            options['days'], options['batch_size'], options['chunk_size'],
+            self.report,
+        )
+        self.stdout.write(f'Отправлено писем: {sent}')
+
+    def report(self, sent):
+        self.stdout.write(f'Отправлено: {sent}')
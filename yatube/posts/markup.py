@@ -0,0 +1,71 @@
+"""
+Разметка текста постов и комментариев.
+
+Небольшое подмножество Markdown: абзацы и переносы строк, списки
+"- пункт", **жирный**, *курсив*, `код`, ссылки [текст](https://...)
+и голые http(s)-адреса. Текст сначала целиком экранируется, поэтому
+никакой HTML пользователя в результат не попадает, а ссылки бывают
+только http и https.
+
+HTML считается один раз при сохранении (posts.signals.render_text)
+и хранится в text_html вместе с номером версии рендерера. После
+изменения правил нужно увеличить VERSION и запустить render_text.
+"""
+import re
+
+from django.utils.html import escape
+
+
+VERSION = 2
+
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+LIST_ITEM_RE = re.compile(r'^[-*] +(.*)$')
+CODE_RE = re.compile(r'`([^`\n]+)`')
+# \x00 — граница спрятанного кода или ссылки, адрес на ней кончается
+LINK_RE = re.compile(r'\[([^\]\n]+)\]\((https?://[^\s)\x00]+)\)')
+URL_RE = re.compile(r'https?://[^\s<\x00]*[^\s<.,:;!?)\x00]')
+STRONG_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EM_RE = re.compile(r'(?<![\w*])[*_](?=\S)(.+?)(?<=\S)[*_](?![\w*])')
+STASH_RE = re.compile('\x00(\\d+)\x00')
+
+
+def _link(url, text):
+    return f'<a href="{url}" rel="nofollow noopener">{text}</a>'
+
+
+def _inline(line):
+    # код и ссылки прячем от правил выделения: внутри адреса
+    # подчеркивания и звездочки не значат курсив
+    stash = []
+
+    def keep(html):
+        stash.append(html)
+        return f'\x00{len(stash) - 1}\x00'
+
+    line = CODE_RE.sub(lambda match: keep(f'<code>{match[1]}</code>'), line)
+    line = LINK_RE.sub(lambda match: keep(_link(match[2], match[1])), line)
+    line = URL_RE.sub(lambda match: keep(_link(match[0], match[0])), line)
+    line = STRONG_RE.sub(r'<strong>\1</strong>', line)
+    line = EM_RE.sub(r'<em>\1</em>', line)
+    return STASH_RE.sub(lambda match: stash[int(match[1])], line)
+
+
+def _block(block):
+    lines = block.split('\n')
+    items = [LIST_ITEM_RE.match(line) for line in lines]
+    if all(items):
+        return '<ul>{}</ul>'.format(''.join(
+            f'<li>{_inline(item[1])}</li>' for item in items
+        ))
+    return '<p>{}</p>'.format('<br>\n'.join(_inline(line) for line in lines))
+
+
+def render(text):
+    """Безопасный HTML для текста с разметкой."""
+    text = text.replace('\x00', '').replace('\r\n', '\n').strip()
+    if not text:
+        return ''
+    return '\n'.join(
+        _block(block.strip('\n'))
+        for block in PARAGRAPH_RE.split(escape(text))
+    )
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('group', 'Группа')], max_length=5, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('bucket', models.PositiveIntegerField(help_text='Номер интервала длиной TRENDING_BUCKET_SECONDS', verbose_name='Интервал')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Активность')),
+            ],
+            options={
+                'verbose_name': 'Счетчик популярности',
+                'verbose_name_plural': 'Счетчики популярности',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingcounter',
+            index=models.Index(fields=['bucket'], name='trending_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingcounter',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id', 'bucket'), name='unique_trending_bucket'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_trendingcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Время публикации комментария', verbose_name='Время публикации'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Время публикации поста', verbose_name='Время публикации'),
+        ),
+    ]
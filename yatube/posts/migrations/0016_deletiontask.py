@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа')], max_length=5, verbose_name='Что удаляем')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('title', models.CharField(max_length=200, verbose_name='Название объекта')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено')], db_index=True, default='pending', max_length=7, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего строк')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Фоновое удаление',
+                'verbose_name_plural': 'Фоновые удаления',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
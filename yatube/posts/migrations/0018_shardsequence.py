@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Счетчик id шардов',
+                'verbose_name_plural': 'Счетчики id шардов',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_shardsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='updated',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Время последнего изменения поста', verbose_name='Время изменения'),
+        ),
+    ]
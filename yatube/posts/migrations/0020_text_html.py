@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='text_html',
+            field=models.TextField(blank=True, default='', verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Версия рендерера HTML'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='text_html',
+            field=models.TextField(blank=True, default='', verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Версия рендерера HTML'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия рендерера HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия рендерера HTML'),
+        ),
+    ]
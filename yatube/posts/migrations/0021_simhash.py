@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_text_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий')], max_length=7, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('key', models.BigIntegerField(help_text='Номер сочетания блоков отпечатка и их значения', verbose_name='Ключ')),
+                ('simhash', models.BigIntegerField(verbose_name='Отпечаток текста')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток текста',
+                'verbose_name_plural': 'Отпечатки текстов',
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='SimHash для поиска повторов (posts.spam)', null=True, verbose_name='Отпечаток текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='SimHash для поиска повторов (posts.spam)', null=True, verbose_name='Отпечаток текста'),
+        ),
+        migrations.AddIndex(
+            model_name='fingerprint',
+            index=models.Index(fields=['kind', 'key', 'created'], name='fingerprint_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fingerprint',
+            index=models.Index(fields=['kind', 'object_id'], name='fingerprint_object_idx'),
+        ),
+    ]
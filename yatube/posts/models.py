@@ -5,16 +5,51 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
+class ShardedQuerySet(models.QuerySet):
+    """create() без явной базы выбирает ее по самому объекту:
+    при шардировании пост попадает в шард автора, а не в default."""
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Текст нового поста',
     )
+    text_html = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Текст в HTML',
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия рендерера HTML',
+    )
+    simhash = models.BigIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Отпечаток текста',
+        help_text='SimHash для поиска повторов (posts.spam)',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         verbose_name='Время публикации',
         help_text='Время публикации поста'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время изменения',
+        help_text='Время последнего изменения поста',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,6 +74,8 @@ class Post(models.Model):
         blank=True,
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
@@ -92,12 +129,33 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Добавить комментарий:',
     )
+    text_html = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Текст в HTML',
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия рендерера HTML',
+    )
+    simhash = models.BigIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Отпечаток текста',
+        help_text='SimHash для поиска повторов (posts.spam)',
+    )
     created = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         verbose_name='Время публикации',
         help_text='Время публикации комментария',
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ('created',)
         verbose_name = 'Комментарий'
@@ -135,3 +193,355 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class Notification(models.Model):
+    """Новые посты автора для подписчика: одна строка на пару,
+    следующие посты автора увеличивают unread (posts.notifications)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    last_post_id = models.PositiveIntegerField(
+        verbose_name='id последнего поста',
+    )
+    unread = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Непрочитанных постов',
+    )
+    updated = models.DateTimeField(
+        verbose_name='Время последнего поста',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_notification_author'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-updated'), name='notification_user_idx'
+            ),
+        )
+        ordering = ('-updated',)
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self):
+        return f'{self.author} для {self.user}: {self.unread}'
+
+
+class Recommendation(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation',
+        verbose_name='Пользователь',
+        help_text='Пользователь, которому предлагаются авторы',
+    )
+    authors = models.TextField(
+        blank=True,
+        verbose_name='Рекомендованные авторы',
+        help_text='id авторов через запятую, по убыванию оценки',
+    )
+    is_stale = models.BooleanField(
+        default=False,
+        db_index=True,
+        verbose_name='Требует пересчета',
+        help_text='Подписки пользователя изменились после расчета',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время расчета',
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self):
+        return f'Рекомендации для {self.user}'
+
+    def author_ids(self):
+        return [int(pk) for pk in self.authors.split(',') if pk]
+
+
+class TrendingCounter(models.Model):
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(
+        max_length=5,
+        choices=KINDS,
+        verbose_name='Тип объекта',
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id объекта',
+    )
+    bucket = models.PositiveIntegerField(
+        verbose_name='Интервал',
+        help_text='Номер интервала длиной TRENDING_BUCKET_SECONDS',
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Активность',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id', 'bucket'),
+                name='unique_trending_bucket'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('bucket',), name='trending_bucket_idx'),
+        )
+        verbose_name = 'Счетчик популярности'
+        verbose_name_plural = 'Счетчики популярности'
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.count}'
+
+
+class DeletionTask(models.Model):
+    USER = 'user'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+    )
+
+    kind = models.CharField(
+        max_length=5,
+        choices=KINDS,
+        verbose_name='Что удаляем',
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id объекта',
+    )
+    title = models.CharField(
+        max_length=200,
+        verbose_name='Название объекта',
+    )
+    status = models.CharField(
+        max_length=7,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        verbose_name='Статус',
+    )
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Всего строк',
+    )
+    processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано',
+    )
+    finished = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Завершено',
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+
+    def __str__(self):
+        return f'Удаление {self.get_kind_display().lower()} {self.title}'
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return min(100, self.processed * 100 // self.total)
+
+
+class Fingerprint(models.Model):
+    """Ключ SimHash поста или комментария (posts.spam)."""
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+
+    kind = models.CharField(
+        max_length=7,
+        choices=KINDS,
+        verbose_name='Тип объекта',
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id объекта',
+    )
+    key = models.BigIntegerField(
+        verbose_name='Ключ',
+        help_text='Номер сочетания блоков отпечатка и их значения',
+    )
+    simhash = models.BigIntegerField(
+        verbose_name='Отпечаток текста',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Создано',
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('kind', 'key', 'created'),
+                name='fingerprint_key_idx',
+            ),
+            models.Index(
+                fields=('kind', 'object_id'),
+                name='fingerprint_object_idx',
+            ),
+        )
+        verbose_name = 'Отпечаток текста'
+        verbose_name_plural = 'Отпечатки текстов'
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.key}'
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесенный из Post командой archive_posts.
+    Сохраняет id, чтобы ссылки на пост продолжали работать."""
+    is_archived = True
+
+    id = models.IntegerField(
+        primary_key=True,
+        verbose_name='id поста',
+    )
+    text = models.TextField(
+        verbose_name='Текст поста',
+    )
+    text_html = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='Текст в HTML',
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Версия рендерера HTML',
+    )
+    pub_date = models.DateTimeField(
+        db_index=True,
+        verbose_name='Время публикации',
+    )
+    updated = models.DateTimeField(
+        verbose_name='Время изменения',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        'Group',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(
+        primary_key=True,
+        verbose_name='id комментария',
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Комментируемый текст',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор',
+    )
+    text = models.TextField(
+        verbose_name='Текст комментария',
+    )
+    text_html = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='Текст в HTML',
+    )
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Версия рендерера HTML',
+    )
+    created = models.DateTimeField(
+        verbose_name='Время публикации',
+    )
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ShardSequence(models.Model):
+    """Общий счетчик id для постов и комментариев на шардах.
+
+    У каждой базы-шарда свой AUTOINCREMENT, поэтому при включенном
+    шардировании id выдаются здесь, в default, и остаются уникальными
+    во всех шардах (см. posts.sharding.next_id).
+    """
+
+    class Meta:
+        verbose_name = 'Счетчик id шардов'
+        verbose_name_plural = 'Счетчики id шардов'
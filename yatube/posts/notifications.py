@@ -0,0 +1,111 @@
+"""
+Уведомления о новых постах авторов, на которых подписан пользователь.
+
+На каждую пару (подписчик, автор) одна строка Notification: новый пост
+автора увеличивает в ней unread, а не добавляет строку, так что десять
+постов одного автора — одно уведомление "10 новых записей".
+
+Рассылка не задерживает публикацию: после коммита поста она уходит
+в поток-писатель write_queue.enqueue, а запрос сразу отвечает
+редиректом. Писатель выполняет ее вне пачки с записями запросов,
+подписчиками по NOTIFICATION_BATCH_SIZE, каждая порция в своей
+транзакции: UPDATE для тех, у кого строка уже есть, и INSERT OR
+IGNORE для остальных. Так рассылка популярного автора не держит
+блокировку записи, а ее сбой откатывает одну порцию и попадает в
+лог. Подписчики читаются из Follow, а не из графа в памяти: граф
+может отставать, и строка для удаленного пользователя нарушила бы
+внешний ключ.
+
+Число непрочитанных для шапки хранится в кэше: рассылка увеличивает
+уже закэшированные счетчики одним get_many и одним set_many, чтение
+уведомлений сбрасывает счетчик в ноль. Запрос к базе нужен только
+при промахе кэша; небольшое расхождение из-за гонок исправляется
+через NOTIFICATION_COUNT_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.db.batching import write_queue
+from posts.models import Follow, Notification
+
+
+def _count_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _fan_out_chunk(author_id, post_id, user_ids):
+    now = timezone.now()
+    with transaction.atomic():
+        Notification.objects.filter(
+            author_id=author_id, user_id__in=user_ids
+        ).update(unread=F('unread') + 1, last_post_id=post_id, updated=now)
+        Notification.objects.bulk_create(
+            (
+                Notification(
+                    user_id=user_id, author_id=author_id,
+                    last_post_id=post_id, unread=1, updated=now,
+                )
+                for user_id in user_ids
+            ),
+            ignore_conflicts=True,
+        )
+
+
+def fan_out(author_id, post_id):
+    """Записывает пост автора в уведомления всех его подписчиков."""
+    followers = list(
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    if not followers:
+        return
+    size = settings.NOTIFICATION_BATCH_SIZE
+    for start in range(0, len(followers), size):
+        _fan_out_chunk(author_id, post_id, followers[start:start + size])
+    keys = [_count_key(user_id) for user_id in followers]
+    counts = cache.get_many(keys)
+    if counts:
+        cache.set_many(
+            {key: count + 1 for key, count in counts.items()},
+            settings.NOTIFICATION_COUNT_TIMEOUT,
+        )
+
+
+def notify_followers(post):
+    author_id, post_id = post.author_id, post.pk
+    # до коммита поста писатель не увидит его строку
+    transaction.on_commit(
+        lambda: write_queue.enqueue(lambda: fan_out(author_id, post_id)),
+        using=post._state.db,
+    )
+
+
+def unread_count(user_id):
+    """Число непрочитанных постов; без запроса, если оно в кэше."""
+    key = _count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id).aggregate(
+            total=Sum('unread')
+        )['total'] or 0
+        cache.set(key, count, settings.NOTIFICATION_COUNT_TIMEOUT)
+    return count
+
+
+def mark_read(user_id):
+    Notification.objects.filter(user_id=user_id, unread__gt=0).update(
+        unread=0
+    )
+    cache.set(_count_key(user_id), 0, settings.NOTIFICATION_COUNT_TIMEOUT)
+
+
+def forget(user_id, author_ids):
+    """Отписка: уведомления об этих авторах больше не нужны."""
+    Notification.objects.filter(
+        user_id=user_id, author_id__in=list(author_ids)
+    ).delete()
+    cache.delete(_count_key(user_id))
@@ -0,0 +1,99 @@
+"""
+Ранжированная лента.
+
+Фоновая задача (build_feed_candidates или первый запрос после
+истечения FEED_REFRESH_SECONDS) берет FEED_CANDIDATE_POOL последних
+постов, считает базовую оценку по свежести и числу комментариев и
+сохраняет в кэш FEED_CANDIDATES лучших. На запрос остается только
+прибавить бонус за подписку на автора и отсортировать кандидатов,
+без обращения к базе.
+"""
+import heapq
+import math
+import time
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from core.cache.stampede import get_or_recompute
+from posts import sharding
+from posts.deletion import visible
+from posts.follow_graph import follow_graph
+from posts.models import Post
+
+
+CANDIDATES_KEY = 'feed:candidates'
+
+
+def _build_candidates():
+    now = time.time()
+    half_life = settings.FEED_HALF_LIFE_HOURS * 60 * 60
+    pool = []
+    comments = {}
+    for posts in sharding.per_shard(Post.objects.order_by('-pub_date')):
+        rows = list(posts.values_list(
+            'pk', 'author_id', 'pub_date'
+        )[:settings.FEED_CANDIDATE_POOL])
+        if not rows:
+            continue
+        pool.extend(rows)
+        comments.update(
+            posts.filter(pk__in=[pk for pk, _, _ in rows])
+            .annotate(comments_count=Count('comments'))
+            .values_list('pk', 'comments_count')
+        )
+    pool = heapq.nlargest(
+        settings.FEED_CANDIDATE_POOL, pool, key=itemgetter(2)
+    )
+    candidates = []
+    for pk, author_id, pub_date in pool:
+        age = max(now - pub_date.timestamp(), 0)
+        score = (
+            0.5 ** (age / half_life)
+            + settings.FEED_COMMENT_WEIGHT * math.log1p(comments.get(pk, 0))
+        )
+        candidates.append((score, pk, author_id))
+    candidates.sort(reverse=True)
+    return candidates[:settings.FEED_CANDIDATES]
+
+
+def candidates():
+    """[(базовая оценка, id поста, id автора)] по убыванию оценки."""
+    return get_or_recompute(
+        CANDIDATES_KEY, _build_candidates, settings.FEED_REFRESH_SECONDS
+    )
+
+
+def refresh():
+    cache.delete(CANDIDATES_KEY)
+    return candidates()
+
+
+def ranked_post_ids(user):
+    """id постов ленты в порядке персональной оценки."""
+    ranked = candidates()
+    if user.is_authenticated:
+        bonus = settings.FEED_FOLLOW_WEIGHT
+        ranked = sorted(
+            (
+                (
+                    score + bonus * follow_graph.is_following(
+                        user.pk, author_id
+                    ),
+                    pk,
+                )
+                for score, pk, author_id in ranked
+            ),
+            reverse=True,
+        )
+    return [pk for _, pk, *rest in ranked]
+
+
+def load_posts(ids):
+    """Посты страницы в заданном порядке."""
+    posts = sharding.in_bulk(
+        sharding.with_related(visible(Post.objects.all())), ids
+    )
+    return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+from posts.follow_graph import follow_graph
+from posts.models import Recommendation, User
+
+
+def mark_stale(user_id):
+    """Подписки пользователя изменились: пересчитать при следующем
+    запуске build_recommendations --changed."""
+    Recommendation.objects.filter(user_id=user_id, is_stale=False).update(
+        is_stale=True
+    )
+
+
+def suggested_authors(user, limit=None):
+    """Рекомендованные авторы, на которых пользователь еще не подписан."""
+    if not user.is_authenticated:
+        return []
+    limit = limit or settings.NUB_OF_SUGGESTIONS
+    authors = Recommendation.objects.filter(user=user).values_list(
+        'authors', flat=True
+    ).first()
+    if not authors:
+        return []
+    ids = [
+        pk for pk in map(int, authors.split(','))
+        if not follow_graph.is_following(user.pk, pk)
+    ][:limit]
+    users = User.objects.in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
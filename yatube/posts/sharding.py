@@ -0,0 +1,278 @@
+"""
+Шардирование постов по авторам.
+
+Post и Comment лежат в базах POST_SHARDS: пост — в шарде своего
+автора (author_id по модулю числа шардов), комментарий — рядом со
+своим постом. Пользователи, группы и подписки остаются в default.
+id постов и комментариев выдает общий счетчик ShardSequence, так что
+адреса /posts/<id>/ однозначны. Счетчик выдает процессу сразу блок из
+POST_SHARD_ID_BLOCK id: запись в default одна на блок, а не на пост.
+
+Запись и чтение через связи (author.posts, post.comments) ShardRouter
+направляет сам. Ленты поверх всех шардов (главная, подписки, группа)
+собираются ShardedFeed: каждый шард отдает свой отсортированный по
+pub_date поток, потоки сливаются k-way merge без загрузки лишнего.
+Пока POST_SHARDS пуст, все функции возвращают обычные queryset'ы.
+"""
+import heapq
+import threading
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+
+from core.db import routers
+from posts.models import Comment, Post, ShardSequence, User
+
+
+SHARDED_MODELS = ('post', 'comment')
+
+
+def is_sharded():
+    return bool(settings.POST_SHARDS)
+
+
+def shards():
+    return settings.POST_SHARDS or ('default',)
+
+
+def shard_for(author_id):
+    """База, в которой лежат посты автора."""
+    aliases = shards()
+    return aliases[author_id % len(aliases)]
+
+
+_block_lock = threading.Lock()
+# следующий id и конец текущего блока процесса
+_block = [0, 0]
+
+
+def _next_block(pk=None):
+    row = ShardSequence.objects.using('default').create(pk=pk)
+    number = row.pk
+    # delete() обнуляет row.pk
+    row.delete()
+    return number * settings.POST_SHARD_ID_BLOCK
+
+
+def next_id():
+    """Следующий id поста или комментария, уникальный во всех шардах."""
+    if transaction.get_connection('default').in_atomic_block:
+        # при откате номер блока вернется в счетчик, поэтому блок
+        # не запоминаем и берем из него только первый id
+        return _next_block()
+    with _block_lock:
+        if _block[0] >= _block[1]:
+            start = _next_block()
+            _block[:] = start, start + settings.POST_SHARD_ID_BLOCK
+        _block[0] += 1
+        return _block[0] - 1
+
+
+def reserve(last_id):
+    """Сдвигает счетчик, чтобы он не выдавал id не больше last_id."""
+    _next_block(last_id // settings.POST_SHARD_ID_BLOCK + 1)
+    with _block_lock:
+        _block[:] = 0, 0
+
+
+def _is_sharded_model(model):
+    return (
+        model._meta.app_label == 'posts'
+        and model._meta.model_name in SHARDED_MODELS
+    )
+
+
+def _locate(model, instance):
+    """Шард для модели по подсказке instance или None."""
+    if isinstance(instance, Post):
+        if instance.author_id is None:
+            return instance._state.db
+        return shard_for(instance.author_id)
+    if isinstance(instance, Comment):
+        if Comment.post.is_cached(instance):
+            return shard_for(instance.post.author_id)
+        return instance._state.db
+    if isinstance(instance, User) and model is Post and instance.pk:
+        return shard_for(instance.pk)
+    return None
+
+
+class ShardRouter:
+    """Post и Comment — в шард автора, остальное — в default."""
+
+    def _db_for(self, model, **hints):
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if _is_sharded_model(model):
+            return _locate(model, instance)
+        if instance is not None and instance._state.db in shards():
+            # автор поста или группа, загружаемые из шарда
+            return 'default'
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        db = self._db_for(model, **hints)
+        if db is not None:
+            # до ReplicaRouter очередь не дойдет: закрепляем сами
+            routers.mark_written()
+        return db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_sharded():
+            return None
+        pool = {'default', *shards()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default' or db not in settings.POST_SHARDS:
+            return None
+        return app_label == 'posts' and model_name in SHARDED_MODELS
+
+
+class ShardedFeed:
+    """Посты нескольких шардов одной лентой по убыванию pub_date.
+
+    Подходит для Paginator: count() суммирует счетчики шардов, срез
+    [start:stop] берет не больше stop строк из каждого шарда и сливает
+    потоки через heapq.merge.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = querysets
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(queryset.count() for queryset in self.querysets)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, stop):
+        streams = [
+            (queryset if stop is None else queryset[:stop]).iterator()
+            for queryset in self.querysets
+        ]
+        return heapq.merge(
+            *streams, key=attrgetter('pub_date'), reverse=True
+        )
+
+    def __iter__(self):
+        return self._merge(None)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return list(islice(self._merge(key.stop), key.start, key.stop))
+
+
+def per_shard(queryset):
+    """Один queryset на каждый шард."""
+    if not is_sharded():
+        return [queryset]
+    return [queryset.using(alias) for alias in shards()]
+
+
+def merged(queryset):
+    """Лента queryset'а со всех шардов."""
+    if not is_sharded():
+        return queryset
+    return ShardedFeed(per_shard(queryset))
+
+
+def for_authors(queryset, author_ids):
+    """Посты авторов: в каждый шард уходят только его авторы."""
+    if not is_sharded():
+        return queryset.filter(author_id__in=list(author_ids))
+    by_shard = {}
+    for author_id in author_ids:
+        by_shard.setdefault(shard_for(author_id), []).append(author_id)
+    return ShardedFeed([
+        queryset.using(alias).filter(author_id__in=ids)
+        for alias, ids in by_shard.items()
+    ])
+
+
+def with_related(queryset):
+    """Автор и группа постов: JOIN в одной базе, отдельные запросы
+    в default при шардировании."""
+    if not is_sharded():
+        return queryset.select_related('author', 'group')
+    return queryset.prefetch_related('author', 'group')
+
+
+def find(queryset, **lookup):
+    """Первый объект по lookup в любом шарде или None."""
+    for shard_queryset in per_shard(queryset):
+        obj = shard_queryset.filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def get_or_404(queryset, **lookup):
+    obj = find(queryset, **lookup)
+    if obj is None:
+        raise Http404(f'{queryset.model._meta.object_name} не найден')
+    return obj
+
+
+def in_bulk(queryset, ids):
+    found = {}
+    for shard_queryset in per_shard(queryset):
+        found.update(shard_queryset.in_bulk(ids))
+    return found
+
+
+def _copy_rows(model, objs, target):
+    # строки, уже скопированные прошлой попыткой, пропускаем: перенос
+    # после сбоя между коммитами повторяется с той же пачки
+    copied = set(
+        model._base_manager.using(target).filter(
+            pk__in=[obj.pk for obj in objs]
+        ).values_list('pk', flat=True)
+    )
+    objs = [obj for obj in objs if obj.pk not in copied]
+    # raw-вставка как у loaddata: без pre_save полей, иначе auto_now_add
+    # перезапишет pub_date и created временем переноса
+    if objs:
+        model._base_manager.using(target)._insert(
+            objs, fields=model._meta.local_concrete_fields, raw=True,
+            using=target,
+        )
+
+
+def move_author(author_id, source, target, batch_size=500):
+    """Переносит посты автора с комментариями из source в target.
+
+    Копия коммитится в target раньше, чем строки удаляются из source:
+    сбой между коммитами оставляет строки в обеих базах, и повторный
+    перенос доделает его, ничего не потеряв.
+    """
+    moved = 0
+    posts = Post.objects.using(source).filter(author_id=author_id)
+    while True:
+        batch = list(posts.order_by('pk')[:batch_size])
+        if not batch:
+            return moved
+        ids = [post.pk for post in batch]
+        comments = list(
+            Comment.objects.using(source).filter(post_id__in=ids)
+        )
+        with transaction.atomic(using=target):
+            _copy_rows(Post, batch, target)
+            _copy_rows(Comment, comments, target)
+        with transaction.atomic(using=source):
+            Comment.objects.using(source).filter(post_id__in=ids).delete()
+            Post.objects.using(source).filter(pk__in=ids).delete()
+        moved += len(batch)
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from posts import live, markup, notifications, sharding, spam, trending
+from posts.follow_graph import follow_graph
+from posts.models import Comment, Fingerprint, Follow, Group, Post, User
+from posts.recommendations import mark_stale
+from posts.templatetags import post_cards
+
+# поля автора и группы, которые видны в карточке поста
+CARD_FIELDS = {
+    User: {'username', 'first_name', 'last_name'},
+    Group: {'slug', 'title'},
+}
+
+
+def follow_saved(sender, instance, created, using, **kwargs):
+    if created:
+        follow_graph.add(instance.user_id, instance.author_id, using)
+        mark_stale(instance.user_id)
+
+
+def follow_deleted(sender, instance, using, **kwargs):
+    follow_graph.remove(instance.user_id, instance.author_id, using)
+    mark_stale(instance.user_id)
+    notifications.forget(instance.user_id, [instance.author_id])
+
+
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        trending.record_post(instance)
+        notifications.notify_followers(instance)
+        live.publish_post(instance)
+
+
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        trending.record_comment(instance)
+
+
+def card_owner_saved(sender, instance, created, update_fields=None,
+                     **kwargs):
+    # вход пользователя сохраняет только last_login
+    if created or (
+        update_fields is not None
+        and not CARD_FIELDS[sender].intersection(update_fields)
+    ):
+        return
+    kind = post_cards.GROUP if sender is Group else post_cards.AUTHOR
+    post_cards.bump_version(kind, instance.pk)
+
+
+def store_fingerprint(sender, instance, created, raw, update_fields=None,
+                      **kwargs):
+    if raw or (update_fields is not None and 'simhash' not in update_fields):
+        return
+    if created and instance.simhash is None:
+        return
+    kind = Fingerprint.POST if sender is Post else Fingerprint.COMMENT
+    spam.store(kind, instance.pk, instance.simhash, replace=not created)
+
+
+def drop_fingerprint(sender, instance, **kwargs):
+    # удаленный спам больше не считается копией; ключи объектов
+    # старше окна удалит prune_fingerprints
+    created = instance.pub_date if sender is Post else instance.created
+    if created is None or created >= spam.window_start():
+        kind = Fingerprint.POST if sender is Post else Fingerprint.COMMENT
+        spam.store(kind, instance.pk, None)
+
+
+def assign_shard_id(sender, instance, raw, **kwargs):
+    if sharding.is_sharded() and instance.pk is None and not raw:
+        instance.pk = sharding.next_id()
+
+
+def render_text(sender, instance, raw, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'text' not in update_fields):
+        return
+    instance.text_html = markup.render(instance.text)
+    instance.text_html_version = markup.VERSION
+
+
+def configure_shard(sender, connection, **kwargs):
+    # авторы и группы лежат в default, внешние ключи на них
+    # в базе шарда проверить нельзя
+    if (
+        connection.vendor == 'sqlite'
+        and connection.alias != 'default'
+        and connection.alias in settings.POST_SHARDS
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+def connect_signals():
+    post_save.connect(
+        follow_saved, sender=Follow, dispatch_uid='posts.follow_saved'
+    )
+    post_delete.connect(
+        follow_deleted, sender=Follow, dispatch_uid='posts.follow_deleted'
+    )
+    post_save.connect(
+        post_saved, sender=Post, dispatch_uid='posts.post_saved'
+    )
+    post_save.connect(
+        comment_saved, sender=Comment, dispatch_uid='posts.comment_saved'
+    )
+    for model in CARD_FIELDS:
+        post_save.connect(
+            card_owner_saved, sender=model,
+            dispatch_uid=f'posts.card_owner_saved.{model.__name__}',
+        )
+    for model in (Post, Comment):
+        pre_save.connect(
+            assign_shard_id, sender=model,
+            dispatch_uid=f'posts.assign_shard_id.{model.__name__}',
+        )
+        pre_save.connect(
+            render_text, sender=model,
+            dispatch_uid=f'posts.render_text.{model.__name__}',
+        )
+        post_save.connect(
+            store_fingerprint, sender=model,
+            dispatch_uid=f'posts.store_fingerprint.{model.__name__}',
+        )
+        post_delete.connect(
+            drop_fingerprint, sender=model,
+            dispatch_uid=f'posts.drop_fingerprint.{model.__name__}',
+        )
+    connection_created.connect(
+        configure_shard, dispatch_uid='posts.configure_shard'
+    )
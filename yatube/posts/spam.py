@@ -0,0 +1,151 @@
+"""
+Поиск почти одинаковых постов и комментариев по SimHash.
+
+Отпечаток текста — 64-битный SimHash его слов: тексты, отличающиеся
+парой слов, получают отпечатки, различающиеся в нескольких битах.
+Отпечаток делится на SPAM_BLOCKS блоков. Если два отпечатка отличаются
+не больше чем в SPAM_MAX_DISTANCE битах, то хотя бы
+SPAM_BLOCKS - SPAM_MAX_DISTANCE блоков у них совпадают целиком. Поэтому
+каждое сочетание из стольких блоков хранится строкой Fingerprint с
+индексом, и кандидатов дает один поиск по индексу с IN по ключам, а не
+сравнение со всей таблицей (схема Manku, Jain, Das Sarma, 2007).
+
+Случайных совпадений одного ключа примерно 28 * N / 2**16 на N
+текстов в окне, и при большом окне их больше SPAM_MAX_CANDIDATES.
+Поэтому кандидаты упорядочены по числу совпавших ключей: чем ближе
+отпечатки, тем больше у них общих блоков и ключей, а случайный
+кандидат почти всегда совпадает в одном. За пределы
+SPAM_MAX_CANDIDATES уходят только кандидаты с одним общим ключом: у
+них различаются SPAM_MAX_DISTANCE блоков, то есть не меньше
+SPAM_MAX_DISTANCE бит, и это копии на самой границе. Проверка
+останавливается, как только найдено SPAM_MAX_COPIES копий.
+
+Отпечаток считает форма при проверке текста, ключи пишут и удаляют
+сигналы post_save и post_delete (posts.signals). Строки старше
+SPAM_WINDOW_HOURS удаляет команда prune_fingerprints.
+"""
+import hashlib
+import re
+from collections import Counter
+from datetime import timedelta
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from posts.models import Fingerprint
+
+
+BITS = 64
+MASK = (1 << BITS) - 1
+WORD_RE = re.compile(r'\w+')
+
+
+def _hash(feature):
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def fingerprint(text):
+    """SimHash текста со знаком (для BigIntegerField) или None,
+    если текст слишком короткий, чтобы повторы что-то значили."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < settings.SPAM_MIN_WORDS:
+        return None
+    # слова без порядка: перестановка и замена пары слов почти не
+    # меняют отпечаток, на коротких текстах это точнее пар слов
+    features = Counter(_hash(word) for word in words)
+    weights = [0] * BITS
+    for value, count in features.items():
+        for bit in range(BITS):
+            if value >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+    result = sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+    return result - (1 << BITS) if result >> (BITS - 1) else result
+
+
+def keys(simhash):
+    """Ключи отпечатка: номер сочетания блоков в старших битах,
+    значения блоков сочетания — в младших."""
+    value = simhash & MASK
+    width = BITS // settings.SPAM_BLOCKS
+    blocks = [
+        value >> index * width & ((1 << width) - 1)
+        for index in range(settings.SPAM_BLOCKS)
+    ]
+    size = settings.SPAM_BLOCKS - settings.SPAM_MAX_DISTANCE
+    keys = []
+    for number, chosen in enumerate(
+        combinations(range(settings.SPAM_BLOCKS), size)
+    ):
+        key = number
+        for index in chosen:
+            key = key << width | blocks[index]
+        keys.append(key)
+    return keys
+
+
+def distance(first, second):
+    return bin((first ^ second) & MASK).count('1')
+
+
+def window_start():
+    return timezone.now() - timedelta(hours=settings.SPAM_WINDOW_HOURS)
+
+
+def near_duplicates(kind, simhash, exclude=None, enough=None):
+    """Сколько объектов kind за окно почти совпадают с отпечатком;
+    с enough счет останавливается на enough."""
+    candidates = Fingerprint.objects.filter(
+        kind=kind, key__in=keys(simhash), created__gte=window_start(),
+    )
+    if exclude is not None:
+        candidates = candidates.exclude(object_id=exclude)
+    # ближние отпечатки совпадают в большем числе ключей
+    candidates = candidates.values('object_id', 'simhash').annotate(
+        matches=Count('pk')
+    ).order_by('-matches', '-object_id')
+    found = 0
+    for candidate in candidates[:settings.SPAM_MAX_CANDIDATES]:
+        if distance(simhash, candidate['simhash']) <= (
+            settings.SPAM_MAX_DISTANCE
+        ):
+            found += 1
+            if found == enough:
+                break
+    return found
+
+
+def is_spam(kind, simhash, exclude=None):
+    return (
+        simhash is not None
+        and near_duplicates(
+            kind, simhash, exclude, enough=settings.SPAM_MAX_COPIES
+        ) >= settings.SPAM_MAX_COPIES
+    )
+
+
+def store(kind, object_id, simhash, replace=True):
+    """Заменяет ключи объекта; None только удаляет старые. У нового
+    объекта (replace=False) старых ключей нет, и DELETE не нужен."""
+    rows = Fingerprint.objects.using('default')
+    if replace:
+        rows.filter(kind=kind, object_id=object_id).delete()
+    if simhash is not None:
+        rows.bulk_create(
+            Fingerprint(
+                kind=kind, object_id=object_id, key=key, simhash=simhash
+            )
+            for key in keys(simhash)
+        )
+
+
+def prune():
+    """Удаляет ключи, вышедшие за окно; возвращает их число."""
+    deleted, _ = Fingerprint.objects.filter(
+        created__lt=window_start()
+    ).delete()
+    return deleted
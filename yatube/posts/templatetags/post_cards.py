@@ -0,0 +1,77 @@
+import secrets
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+# в карточке есть имя автора и ссылка на группу: их правка меняет
+# версию, и карточки всех постов автора или группы отрисуются заново
+AUTHOR = 'author'
+GROUP = 'group'
+
+
+def version_key(kind, object_id):
+    return f'post_card:{kind}:{object_id}'
+
+
+def bump_version(kind, object_id):
+    """Автор или группа изменились: их карточки устарели."""
+    cache.set(version_key(kind, object_id), secrets.token_hex(4), None)
+
+
+def _versions(posts):
+    keys = set()
+    for post in posts:
+        keys.add(version_key(AUTHOR, post.author_id))
+        if post.group_id:
+            keys.add(version_key(GROUP, post.group_id))
+    versions = cache.get_many(keys)
+    # версия могла быть вытеснена, а карточки под ней остаться:
+    # потерянная версия заменяется новой, а не пустой
+    missing = {key: secrets.token_hex(4) for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def card_key(post, versions=None):
+    """Ключ карточки: id поста и его версия — время изменения
+    и версия HTML текста, — а также версии автора и группы."""
+    if versions is None:
+        versions = _versions([post])
+    group = versions.get(version_key(GROUP, post.group_id), '')
+    return (
+        f'post_card:{post.pk}:{post.updated.timestamp()}:'
+        f'{post.text_html_version}:'
+        f'{versions[version_key(AUTHOR, post.author_id)]}:{group}'
+    )
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек постов страницы.
+
+    Готовые карточки берутся из кэша одним get_many, отрисовываются
+    только новые и измененные посты. Использование:
+    {% post_cards page_obj as cards %}{% for card in cards %}...
+    """
+    posts = list(posts)
+    versions = _versions(posts)
+    keys = [card_key(post, versions) for post in posts]
+    cached = cache.get_many(keys)
+    rendered = {}
+    for post, key in zip(posts, keys):
+        if key not in cached:
+            rendered[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TIMEOUT)
+        cached.update(rendered)
+    return [mark_safe(cached[key]) for key in keys]
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.paginator import EstimatedCountPaginator
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='1234567'
+        )
+        cls.user = User.objects.create(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Тестовый пост {i}', group=cls.group
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.admin, author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelists_open(self):
+        """Списки постов, комментариев и подписок открываются."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f'admin:posts_{model}_changelist')
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Связанные объекты строк загружаются одним запросом."""
+        url = reverse('admin:posts_comment_changelist')
+        self.client.get(url)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        Comment.objects.create(
+            post=self.posts[1], author=self.admin, text='Еще комментарий'
+        )
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+    def test_estimated_count(self):
+        """Большая таблица без фильтров оценивается по MAX(pk),
+        отфильтрованная считается точно."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        paginator.exact_limit = 2
+        self.assertEqual(paginator.count, self.posts[-1].pk)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 2
+        )
+        filtered.exact_limit = 2
+        self.assertEqual(filtered.count, 5)
+        self.assertEqual(filtered.num_pages, 3)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import ArchivedComment, ArchivedPost, Comment, Group, Post
+
+
+User = get_user_model()
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.old = []
+        for i in range(3):
+            post = Post.objects.create(
+                author=self.user, text=f'Старый пост {i}', group=self.group
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.now() - timedelta(days=400 + i)
+            )
+            self.old.append(post)
+        Comment.objects.create(
+            post=self.old[0], author=self.user, text='Комментарий'
+        )
+        self.new = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        call_command(
+            'archive_posts', '--days', '365', '--batch-size', '2',
+            stdout=StringIO(),
+        )
+        self.client = Client()
+
+    def test_old_posts_moved(self):
+        """Старые посты и их комментарии переезжают в архив."""
+        self.assertEqual(list(Post.objects.all()), [self.new])
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertFalse(Comment.objects.exists())
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old[0].pk)
+
+    def test_post_detail_fallback(self):
+        """Архивный пост открывается по прежнему адресу."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old[0].pk})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post'].text, 'Старый пост 0')
+        self.assertEqual(response.context['count'], 4)
+        self.assertEqual(len(response.context['comments_all']), 1)
+
+    def test_lists_include_archive(self):
+        """Профиль и группа показывают сначала новые, затем архивные."""
+        for url in (
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                texts = [post.text for post in response.context['page_obj']]
+                self.assertEqual(texts, [
+                    'Новый пост', 'Старый пост 0', 'Старый пост 1',
+                    'Старый пост 2',
+                ])
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Group, Post
+from posts.templatetags.post_cards import card_key, post_cards
+
+
+User = get_user_model()
+
+
+class PostCardsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Тестовый пост {i}', group=self.group
+            )
+            for i in range(3)
+        ]
+
+    def test_cards_cached(self):
+        """Повторная страница собирается из кэша без запросов к базе."""
+        posts = list(Post.objects.all())
+        cards = post_cards(posts)
+        self.assertEqual(len(cards), 3)
+        self.assertIn('Тестовый пост 2', cards[0])
+        self.assertIn('все записи группы', cards[0])
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(post_cards(posts), cards)
+
+    def test_edit_renders_only_changed_card(self):
+        """Правка поста меняет ключ его карточки, остальные берутся из
+        кэша."""
+        post_cards(Post.objects.all())
+        post = self.posts[0]
+        old_key = card_key(post)
+        post.text = 'Измененный пост'
+        post.save()
+        self.assertNotEqual(card_key(post), old_key)
+        posts = list(Post.objects.all())
+        # автор и группа нужны только для отрисовки одной карточки
+        with self.assertNumQueries(2):
+            cards = post_cards(posts)
+        self.assertIn('Измененный пост', cards[-1])
+
+    def test_author_and_group_rename_rerender(self):
+        """Новое имя автора и адрес группы сразу видны в карточках."""
+        post_cards(Post.objects.all())
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        self.group.slug = 'new-slug'
+        self.group.save()
+        cards = post_cards(Post.objects.all())
+        self.assertIn('Лев Толстой', cards[0])
+        self.assertIn('/group/new-slug/', cards[0])
+
+    def test_login_keeps_cards(self):
+        """Сохранение last_login не сбрасывает карточки автора."""
+        post = Post.objects.first()
+        key = card_key(post)
+        self.user.save(update_fields=('last_login',))
+        self.assertEqual(card_key(post), key)
@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from posts.deletion import schedule_deletion
+from posts.models import (
+    Comment, DeletionTask, Follow, Group, Notification, Post,
+)
+
+
+User = get_user_model()
+
+
+class BackgroundDeletionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(username='auth')
+        self.reader = User.objects.create(username='HasNoName')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Тестовый пост {i}', group=self.group
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client = Client()
+
+    def test_user_hidden_right_away(self):
+        """Пользователь и его посты скрываются до фактического удаления."""
+        schedule_deletion(self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Post.objects.filter(author=self.user).exists())
+
+    def test_user_deleted_in_batches(self):
+        """Команда удаляет контент пачками и сообщает прогресс."""
+        task = schedule_deletion(self.user)
+        out = StringIO()
+        call_command('process_deletions', '--batch-size', '2', stdout=out)
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        self.assertEqual(task.processed, task.total)
+        self.assertEqual(task.total, 7)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertIn('(100%)', out.getvalue())
+
+    def test_notifications_deleted_in_batches(self):
+        """Уведомления об авторе и для автора удаляются шагами задачи."""
+        pairs = ((self.reader, self.user), (self.user, self.reader))
+        for user, author in pairs:
+            Notification.objects.create(
+                user=user, author=author, last_post_id=self.posts[0].pk,
+                updated=timezone.now(),
+            )
+        task = schedule_deletion(self.user)
+        call_command(
+            'process_deletions', '--batch-size', '2', stdout=StringIO()
+        )
+        task.refresh_from_db()
+        self.assertEqual(task.total, 9)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_group_unlinked_and_deleted(self):
+        """Посты удаленной группы остаются без группы."""
+        schedule_deletion(self.group)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+        self.assertEqual(response.status_code, 404)
+        call_command('process_deletions', stdout=StringIO())
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 5)
+
+    def test_admin_requires_cascade_permissions(self):
+        """Без права удалять посты и комментарии автора не удалить."""
+        staff = User.objects.create(username='staff', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(
+            codename__in=('view_user', 'delete_user')
+        ))
+        self.client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=(self.user.pk,))
+        response = self.client.get(url)
+        self.assertEqual(
+            set(response.context['perms_lacking']),
+            {'Пост', 'Комментарий', 'Подписка'},
+        )
+        response = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(DeletionTask.objects.exists())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='1234567'
+        )
+        self.client.force_login(admin)
+        self.client.post(url, {'post': 'yes'})
+        self.assertTrue(DeletionTask.objects.filter(
+            object_id=self.user.pk, kind=DeletionTask.USER
+        ).exists())
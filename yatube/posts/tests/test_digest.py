@@ -0,0 +1,68 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import digest
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class DigestTest(TestCase):
+    def setUp(self):
+        self.first = User.objects.create(username='first')
+        self.second = User.objects.create(username='second')
+        self.silent = User.objects.create(username='silent')
+        self.reader = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.quiet = User.objects.create(
+            username='quiet', email='quiet@example.com'
+        )
+        self.no_email = User.objects.create(username='no_email')
+        for user, author in (
+            (self.reader, self.first),
+            (self.reader, self.second),
+            (self.reader, self.silent),
+            (self.quiet, self.silent),
+            (self.no_email, self.first),
+        ):
+            Follow.objects.create(user=user, author=author)
+        old = Post.objects.create(author=self.silent, text='Старый пост')
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        self.older = Post.objects.create(author=self.first, text='Первый')
+        self.newer = Post.objects.create(author=self.second, text='Второй')
+        Post.objects.filter(pk=self.older.pk).update(
+            pub_date=timezone.now() - timedelta(days=1)
+        )
+
+    def test_one_letter_per_reader(self):
+        """Письмо только подписчику с новыми постами, свежие сверху."""
+        out = StringIO()
+        call_command('send_digest', '--chunk-size', '1', stdout=out)
+        self.assertIn('Отправлено писем: 1', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['reader@example.com'])
+        body = message.body
+        self.assertLess(body.index('Второй'), body.index('Первый'))
+        self.assertIn(f'/posts/{self.newer.pk}/', body)
+        self.assertNotIn('Старый пост', body)
+
+    @override_settings(DIGEST_MAX_POSTS=1)
+    def test_more_posts(self):
+        """Посты сверх DIGEST_MAX_POSTS заменяет ссылка на ленту."""
+        self.assertEqual(digest.send(batch_size=1, chunk_size=2), 1)
+        body = mail.outbox[0].body
+        self.assertIn('Второй', body)
+        self.assertNotIn('Первый', body)
+        self.assertIn('И еще записей: 1. Все записи: ', body)
+        self.assertIn('/follow/', body)
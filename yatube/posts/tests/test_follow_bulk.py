@@ -0,0 +1,108 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.follow_graph import follow_graph
+from posts.models import Follow, Notification
+
+
+User = get_user_model()
+
+
+class FollowBulkTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.reset()
+        self.user = User.objects.create(username='reader')
+        self.authors = [
+            User.objects.create(username=f'author{i}') for i in range(3)
+        ]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post(self, data):
+        return self.client.post(
+            reverse('posts:follow_bulk'),
+            json.dumps(data),
+            content_type='application/json',
+        )
+
+    def test_follow_idempotent(self):
+        """Повтор запроса не меняет подписки и отдает то же состояние."""
+        data = {'follow': ['author0', 'author1', 'reader', 'ghost']}
+        first = self.post(data).json()
+        self.assertEqual(first, {
+            'following': ['author0', 'author1'],
+            'not_following': ['reader'],
+            'not_found': ['ghost'],
+            'rejected': ['reader'],
+            'following_count': 2,
+        })
+        self.assertEqual(self.post(data).json(), first)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(
+            follow_graph.is_following(self.user.pk, self.authors[1].pk)
+        )
+
+    def test_unfollow(self):
+        """Отписка одним DELETE, вместе с уведомлениями об авторе."""
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        Notification.objects.create(
+            user=self.user, author=self.authors[0], last_post_id=1,
+            updated=timezone.now(),
+        )
+        response = self.post({
+            'follow': ['author2'], 'unfollow': ['author0', 'author1'],
+        })
+        self.assertEqual(response.json()['following'], ['author2'])
+        self.assertEqual(response.json()['following_count'], 1)
+        self.assertEqual(
+            list(Follow.objects.values_list('author__username', flat=True)),
+            ['author2'],
+        )
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(
+            follow_graph.is_following(self.user.pk, self.authors[0].pk)
+        )
+
+    def test_queries_do_not_grow(self):
+        """Число запросов не зависит от числа имен."""
+        names = [author.username for author in self.authors]
+        self.post({'follow': names[:1]})
+        follow_graph.following(self.user.pk)
+        with self.assertNumQueries(5):
+            self.post({'follow': names[1:]})
+
+    def test_graph_untouched_on_rollback(self):
+        """Граф меняется только после коммита подписок."""
+        follow_graph.following(self.user.pk)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.post({'follow': ['author0']})
+                raise RuntimeError
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(
+            follow_graph.is_following(self.user.pk, self.authors[0].pk)
+        )
+
+    @override_settings(FOLLOW_BULK_MAX=2)
+    def test_bad_requests(self):
+        """Неверный JSON, пересечение списков и лимит — ответ 400."""
+        url = reverse('posts:follow_bulk')
+        for body in ('not json', '[]', '{"follow": "author0"}'):
+            response = self.client.post(
+                url, body, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.post({'follow': ['author0'], 'unfollow': ['author0']})
+        self.assertEqual(response.status_code, 400)
+        response = self.post({'follow': ['author0', 'author1', 'author2']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(Follow.objects.exists())
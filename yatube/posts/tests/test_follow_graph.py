@@ -0,0 +1,144 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.core.cache import caches
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.cache.backends import LocalLRU, TieredCache
+from posts.follow_graph import VERSION_KEY, FollowGraph, follow_graph
+from posts.models import Follow
+
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        follow_graph.reset()
+        self.user = User.objects.create(username='HasNoName')
+        self.author = User.objects.create(username='auth')
+        self.other = User.objects.create(username='other')
+
+    def test_loads_lazily_and_updates_on_signals(self):
+        """Граф обновляется по сигналам сохранения и удаления Follow."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(
+            follow_graph.is_following(self.user.pk, self.author.pk)
+        )
+        Follow.objects.create(user=self.user, author=self.other)
+        self.assertEqual(follow_graph.following_count(self.user.pk), 2)
+        self.assertEqual(follow_graph.followers_count(self.author.pk), 1)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(
+            follow_graph.is_following(self.user.pk, self.author.pk)
+        )
+        self.assertEqual(
+            list(follow_graph.following(self.user.pk)), [self.other.pk]
+        )
+
+    def test_intersection(self):
+        """Пересечение подписок двух пользователей."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.user, author=self.other)
+        self.assertEqual(
+            list(follow_graph.common_following(self.user.pk, self.other.pk)),
+            [self.author.pk]
+        )
+        self.assertEqual(
+            list(follow_graph.common_followers(self.author.pk, self.other.pk)),
+            [self.user.pk]
+        )
+
+    def test_rolled_back_follow_forgotten(self):
+        """Подписка из откаченной транзакции пропадает из графа."""
+        follow_graph.following(self.user.pk)
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.author)
+                self.assertTrue(
+                    follow_graph.is_following(self.user.pk, self.author.pk)
+                )
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(
+            follow_graph.is_following(self.user.pk, self.author.pk)
+        )
+
+    def test_version_bumped_by_other_process(self):
+        """Граф замечает версию, увеличенную другим процессом."""
+        follow_graph.following(self.user.pk)
+        Follow.objects.bulk_create(
+            [Follow(user=self.user, author=self.author)]
+        )
+        config = settings.CACHES[settings.FOLLOW_GRAPH_CACHE_ALIAS]
+        other = TieredCache(config['LOCATION'], config)
+        # у другого процесса свой L1
+        other._l1 = LocalLRU(10)
+        other.incr(VERSION_KEY)
+        self.assertTrue(
+            follow_graph.is_following(self.user.pk, self.author.pk)
+        )
+
+    def test_views_write_despite_stale_graph(self):
+        """Подписка и отписка пишутся, даже если граф процесса отстал."""
+        client = Client()
+        client.force_login(self.user)
+        follow_graph.following(self.user.pk)
+        # подписку создал другой процесс: здешний граф о ней не знает
+        Follow.objects.bulk_create(
+            [Follow(user=self.user, author=self.author)]
+        )
+        client.get(reverse('posts:profile_unfollow', args=('auth',)))
+        self.assertFalse(Follow.objects.exists())
+        # а здесь граф считает, что подписка уже есть
+        follow_graph.add(self.user.pk, self.other.pk)
+        client.get(reverse('posts:profile_follow', args=('other',)))
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.other).exists()
+        )
+
+
+class FollowGraphCommitTest(TransactionTestCase):
+    def test_version_bumped_after_commit(self):
+        """Версия графа растет только после коммита подписки."""
+        follow_graph.reset()
+        user = User.objects.create(username='HasNoName')
+        author = User.objects.create(username='auth')
+        version = follow_graph._shared_version()
+        shared = caches[settings.FOLLOW_GRAPH_CACHE_ALIAS]
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=user, author=author)
+            self.assertEqual(shared.get(VERSION_KEY), version)
+        self.assertEqual(shared.get(VERSION_KEY), version + 1)
+        self.assertTrue(follow_graph.is_following(user.pk, author.pk))
+
+    def test_one_reload_per_version(self):
+        """После смены версии граф перечитывает один поток из многих."""
+        user = User.objects.create(username='HasNoName')
+        follow_graph.following(user.pk)
+        caches[settings.FOLLOW_GRAPH_CACHE_ALIAS].incr(VERSION_KEY)
+        with mock.patch.object(
+            FollowGraph, '_load', autospec=True, side_effect=FollowGraph._load
+        ) as loads:
+            threads = [
+                threading.Thread(
+                    target=follow_graph.following, args=(user.pk,)
+                )
+                for _ in range(4)
+            ]
+            # пока блокировка занята, все потоки успевают увидеть новую
+            # версию и встают в очередь на перезагрузку
+            with follow_graph._lock:
+                for thread in threads:
+                    thread.start()
+                time.sleep(0.1)
+            for thread in threads:
+                thread.join()
+        self.assertEqual(loads.call_count, 1)
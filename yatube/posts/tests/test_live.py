@@ -0,0 +1,117 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from core.pubsub import Broker, Full, broker
+from posts import live
+from posts.follow_graph import follow_graph
+from posts.models import Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class BrokerTest(SimpleTestCase):
+    def test_publish_and_limit(self):
+        """Сообщения доходят до подписчиков канала, число подписок
+        ограничено."""
+        local = Broker()
+        first = local.subscribe(['a', 'b'], limit=2)
+        second = local.subscribe(['b'], limit=2)
+        with self.assertRaises(Full):
+            local.subscribe(['c'], limit=2)
+        self.assertEqual(local.publish('b', 1), 2)
+        local.publish('a', 2)
+        self.assertEqual(first.get(0), [1, 2])
+        self.assertEqual(second.get(0), [1])
+        self.assertEqual(second.get(0.01), [])
+        first.close()
+        second.close()
+        self.assertEqual(local.subscribers, 0)
+        self.assertEqual(local.publish('b', 3), 0)
+
+
+@override_settings(SSE_HEARTBEAT_SECONDS=0.01, SSE_MAX_SECONDS=0.2)
+class LiveFeedTest(TestCase):
+    def setUp(self):
+        follow_graph.reset()
+        self.user = User.objects.create(username='auth')
+        self.client = Client()
+
+    def events(self, response):
+        return (chunk.decode() for chunk in response.streaming_content)
+
+    def test_stream(self):
+        """Поток начинается с retry, шлет пинги и события posts."""
+        response = self.client.get(reverse('posts:live'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        events = self.events(response)
+        self.assertEqual(next(events), 'retry: 3000\n\n')
+        self.assertEqual(next(events), ': ping\n\n')
+        broker.publish(live.FEED_CHANNEL, {'id': 7})
+        broker.publish(live.FEED_CHANNEL, {'id': 9})
+        event = next(events).splitlines()
+        self.assertEqual(event[:2], ['id: 9', 'event: posts'])
+        self.assertEqual(
+            json.loads(event[2][len('data: '):]), {'count': 2, 'last_id': 9}
+        )
+        # поток закрывается по SSE_MAX_SECONDS и освобождает подписку
+        list(events)
+        self.assertEqual(broker.subscribers, 0)
+
+    def test_follow_feed(self):
+        """Лента подписок слушает только своих авторов и требует входа."""
+        author = User.objects.create(username='author')
+        Follow.objects.create(user=self.user, author=author)
+        response = self.client.get(reverse('posts:live'), {'follow': 1})
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:live'), {'follow': 1})
+        events = self.events(response)
+        next(events)
+        broker.publish(live.author_channel(self.user.pk), {'id': 1})
+        broker.publish(live.author_channel(author.pk), {'id': 2})
+        self.assertIn('"last_id": 2', next(events))
+        # клиент отключился: сервер закрывает ответ и поток
+        response.close()
+        self.assertEqual(broker.subscribers, 0)
+
+    @override_settings(SSE_MAX_CONNECTIONS=0)
+    def test_too_many_streams(self):
+        """Сверх SSE_MAX_CONNECTIONS поток не открывается."""
+        response = self.client.get(reverse('posts:live'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+    @override_settings(WSGI_THREADS=2, SSE_MAX_CONNECTIONS=50)
+    def test_streams_leave_threads_for_requests(self):
+        """Потоков SSE не больше половины потоков WSGI-сервера."""
+        first = self.client.get(reverse('posts:live'))
+        self.assertEqual(first.status_code, 200)
+        next(self.events(first))
+        second = self.client.get(reverse('posts:live'))
+        self.assertEqual(second.status_code, 503)
+        first.close()
+        self.assertEqual(broker.subscribers, 0)
+
+
+class PublishTest(TransactionTestCase):
+    def test_post_published_after_commit(self):
+        """Новый пост попадает в каналы ленты, группы и автора."""
+        author = User.objects.create(username='auth')
+        group = Group.objects.create(title='Группа', slug='group')
+        channels = (
+            live.FEED_CHANNEL,
+            live.group_channel(group.pk),
+            live.author_channel(author.pk),
+        )
+        subscriptions = [broker.subscribe([channel]) for channel in channels]
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        for subscription in subscriptions:
+            with subscription:
+                self.assertEqual(subscription.get(0), [{'id': post.pk}])
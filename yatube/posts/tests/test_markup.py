@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import markup
+from posts.models import Comment, Post
+
+
+User = get_user_model()
+
+
+class MarkupTest(TestCase):
+    def test_render(self):
+        """Разметка превращается в HTML, чужой HTML экранируется."""
+        cases = (
+            ('**жирный** и *курсив*',
+             '<p><strong>жирный</strong> и <em>курсив</em></p>'),
+            ('строка\nстрока', '<p>строка<br>\nстрока</p>'),
+            ('- раз\n- два', '<ul><li>раз</li><li>два</li></ul>'),
+            ('[сайт](https://example.com/a_b)',
+             '<p><a href="https://example.com/a_b" rel="nofollow noopener">'
+             'сайт</a></p>'),
+            ('<script>alert(1)</script>',
+             '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>'),
+            ('[x](javascript:alert(1))', '<p>[x](javascript:alert(1))</p>'),
+        )
+        for text, html in cases:
+            with self.subTest(text=text):
+                self.assertEqual(markup.render(text), html)
+
+    def test_url_before_code_or_link(self):
+        """Голый адрес вплотную к коду или ссылке их не съедает."""
+        cases = (
+            ('см. https://x.com`код`',
+             '<p>см. <a href="https://x.com" rel="nofollow noopener">'
+             'https://x.com</a><code>код</code></p>'),
+            ('https://x.com[a](https://y.com)',
+             '<p><a href="https://x.com" rel="nofollow noopener">'
+             'https://x.com</a><a href="https://y.com" '
+             'rel="nofollow noopener">a</a></p>'),
+        )
+        for text, html in cases:
+            with self.subTest(text=text):
+                self.assertEqual(markup.render(text), html)
+
+
+class TextHtmlTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='auth')
+
+    def test_html_stored_on_save(self):
+        """HTML считается при сохранении поста и комментария."""
+        post = Post.objects.create(author=self.user, text='**пост**')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='*коммент*'
+        )
+        self.assertEqual(post.text_html, '<p><strong>пост</strong></p>')
+        self.assertEqual(post.text_html_version, markup.VERSION)
+        self.assertEqual(comment.text_html, '<p><em>коммент</em></p>')
+
+    def test_command_renders_stale_rows(self):
+        """Команда пересчитывает строки старой версии рендерера."""
+        post = Post.objects.create(author=self.user, text='**пост**')
+        Post.objects.filter(pk=post.pk).update(
+            text_html='', text_html_version=0
+        )
+        call_command('render_text', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p><strong>пост</strong></p>')
+        self.assertEqual(post.text_html_version, markup.VERSION)
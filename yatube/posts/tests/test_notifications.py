@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import notifications
+from posts.follow_graph import follow_graph
+from posts.models import Follow, Notification, Post
+
+
+User = get_user_model()
+
+
+class NotificationTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.reset()
+        self.author = User.objects.create(username='auth')
+        self.reader = User.objects.create(username='reader')
+        self.other = User.objects.create(username='other')
+        for user in (self.reader, self.other):
+            Follow.objects.create(user=user, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_fan_out_coalesced(self):
+        """Посты одного автора сливаются в одно уведомление."""
+        Post.objects.create(author=self.author, text='Первый')
+        post = Post.objects.create(author=self.author, text='Второй')
+        Post.objects.create(author=self.reader, text='Без подписчиков')
+        rows = Notification.objects.order_by('user_id')
+        self.assertEqual(
+            list(rows.values_list('user_id', 'unread', 'last_post_id')),
+            [(self.reader.pk, 2, post.pk), (self.other.pk, 2, post.pk)],
+        )
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=1)
+    def test_fan_out_chunked(self):
+        """Каждая порция подписчиков записывается в своей транзакции."""
+        with CaptureQueriesContext(connection) as queries:
+            notifications.fan_out(self.author.pk, 1)
+        transactions = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('BEGIN')
+        ]
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(
+            Notification.objects.filter(author=self.author).count(), 2
+        )
+
+    def test_cached_count(self):
+        """Счетчик читается из кэша и растет при рассылке."""
+        Post.objects.create(author=self.author, text='Первый')
+        self.assertEqual(notifications.unread_count(self.reader.pk), 1)
+        Post.objects.create(author=self.author, text='Второй')
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.reader.pk), 2)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, '<span class="badge bg-danger">2</span>'
+        )
+
+    def test_list_marks_read(self):
+        """Страница уведомлений показывает новые посты и сбрасывает счетчик."""
+        post = Post.objects.create(author=self.author, text='Первый')
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertEqual(response.context['page_obj'][0].unread, 1)
+        self.assertEqual(notifications.unread_count(self.reader.pk), 0)
+        self.assertEqual(
+            Notification.objects.get(user=self.other).unread, 1
+        )
+
+    def test_unfollow_forgets(self):
+        """После отписки уведомления об авторе удаляются."""
+        Post.objects.create(author=self.author, text='Первый')
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(Notification.objects.filter(user=self.reader))
+        self.assertEqual(notifications.unread_count(self.reader.pk), 0)
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import ranking
+from posts.follow_graph import follow_graph
+from posts.models import Comment, Follow, Post
+
+
+User = get_user_model()
+
+
+class RankedFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        follow_graph.reset()
+        self.user = User.objects.create(username='HasNoName')
+        self.author = User.objects.create(username='auth')
+        self.other = User.objects.create(username='other')
+        self.followed_post = Post.objects.create(
+            author=self.author, text='Пост автора из подписок'
+        )
+        self.discussed_post = Post.objects.create(
+            author=self.other, text='Обсуждаемый пост'
+        )
+        self.new_post = Post.objects.create(
+            author=self.other, text='Новый пост'
+        )
+        for i in range(5):
+            Comment.objects.create(
+                post=self.discussed_post, author=self.user,
+                text=f'Комментарий {i}',
+            )
+        Follow.objects.create(user=self.user, author=self.author)
+
+    def test_base_score_uses_comments(self):
+        """Обсуждаемый пост получает большую базовую оценку."""
+        ids = [pk for _, pk, _ in ranking.refresh()]
+        self.assertEqual(ids[0], self.discussed_post.pk)
+
+    def test_follow_bonus_for_viewer(self):
+        """Пост автора из подписок поднимается для подписчика."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:index_ranked'))
+        self.assertEqual(
+            list(response.context['page_obj'])[0], self.followed_post
+        )
+        anonymous = Client().get(reverse('posts:index_ranked'))
+        self.assertEqual(
+            list(anonymous.context['page_obj'])[0], self.discussed_post
+        )
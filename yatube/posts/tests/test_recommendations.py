@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.follow_graph import follow_graph
+from posts.models import Follow, Recommendation
+
+
+User = get_user_model()
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        follow_graph.reset()
+        self.user = User.objects.create(username='HasNoName')
+        self.friend = User.objects.create(username='friend')
+        self.reader = User.objects.create(username='reader')
+        self.author = User.objects.create(username='auth')
+        self.popular = User.objects.create(username='popular')
+        # user и reader читают одного автора, friend читает popular
+        Follow.objects.create(user=self.user, author=self.friend)
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.friend, author=self.popular)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.reader, author=self.popular)
+
+    def test_build_recommendations(self):
+        """Рекомендуются подписки друзей и похожих читателей."""
+        call_command('build_recommendations', stdout=StringIO())
+        recommendation = Recommendation.objects.get(user=self.user)
+        self.assertEqual(recommendation.author_ids(), [self.popular.pk])
+        self.assertFalse(recommendation.is_stale)
+        self.assertNotIn(
+            self.reader.pk,
+            Recommendation.objects.get(user=self.friend).author_ids()
+        )
+
+    def test_follow_marks_stale_and_changed_recomputes(self):
+        """Новая подписка помечает рекомендации к пересчету."""
+        call_command('build_recommendations', stdout=StringIO())
+        Follow.objects.create(user=self.user, author=self.popular)
+        self.assertTrue(Recommendation.objects.get(user=self.user).is_stale)
+        call_command(
+            'build_recommendations', '--changed',
+            stdout=StringIO()
+        )
+        recommendation = Recommendation.objects.get(user=self.user)
+        self.assertFalse(recommendation.is_stale)
+        self.assertNotIn(self.popular.pk, recommendation.author_ids())
+
+    def test_changed_clears_users_without_follows(self):
+        """Отписавшийся от всех остается без рекомендаций."""
+        call_command('build_recommendations', stdout=StringIO())
+        Follow.objects.filter(user=self.user).delete()
+        self.assertTrue(Recommendation.objects.get(user=self.user).is_stale)
+        out = StringIO()
+        call_command('build_recommendations', '--changed', stdout=out)
+        self.assertIn('Удалены рекомендации 1 пользователей', out.getvalue())
+        recommendations = Recommendation.objects.all()
+        self.assertFalse(recommendations.filter(user=self.user).exists())
+        self.assertTrue(recommendations.filter(user=self.reader).exists())
+
+    def test_suggestions_shown_on_follow_index(self):
+        """Рекомендации попадают в контекст follow_index и profile."""
+        call_command('build_recommendations', stdout=StringIO())
+        client = Client()
+        client.force_login(self.user)
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(
+                    response.context['suggestions'], [self.popular]
+                )
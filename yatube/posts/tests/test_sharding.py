@@ -0,0 +1,190 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.db import routers
+from posts import archive, sharding
+from posts.models import ArchivedComment, ArchivedPost, Comment, Group, Post
+from posts.sharding import ShardedFeed, ShardRouter, shard_for
+
+
+User = get_user_model()
+
+SHARDS = ('shard_0', 'shard_1')
+
+
+class ShardedFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = User.objects.create(username='first')
+        cls.second = User.objects.create(username='second')
+        now = timezone.now()
+        for i in range(6):
+            post = Post.objects.create(
+                author=(cls.first, cls.second)[i % 2], text=f'Пост {i}'
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(hours=i)
+            )
+
+    def test_merge_by_pub_date(self):
+        """Ленты шардов сливаются по убыванию даты, срезы постраничны."""
+        feed = ShardedFeed([
+            Post.objects.filter(author=self.first),
+            Post.objects.filter(author=self.second),
+        ])
+        self.assertEqual(feed.count(), 6)
+        self.assertEqual(
+            [post.text for post in feed],
+            [f'Пост {i}' for i in range(6)],
+        )
+        self.assertEqual(
+            [post.text for post in feed[2:5]], ['Пост 2', 'Пост 3', 'Пост 4']
+        )
+        self.assertEqual(feed[5].text, 'Пост 5')
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardRouterTest(TestCase):
+    def setUp(self):
+        self.router = ShardRouter()
+        self.author = User(pk=3, username='auth')
+        self.author._state.db = 'default'
+
+    def test_posts_follow_author(self):
+        """Пост и его комментарии идут в шард автора."""
+        self.assertEqual(shard_for(3), 'shard_1')
+        post = Post(author=self.author, text='Тестовый пост')
+        self.assertEqual(post._state.db, 'shard_1')
+        self.assertEqual(
+            self.router.db_for_write(Post, instance=post), 'shard_1'
+        )
+        comment = Comment(post=post, author=self.author, text='Коммент')
+        self.assertEqual(
+            self.router.db_for_write(Comment, instance=comment), 'shard_1'
+        )
+        self.assertEqual(
+            self.router.db_for_read(Post, instance=self.author), 'shard_1'
+        )
+
+    def test_global_models_stay_in_default(self):
+        """Автор и группа поста из шарда читаются из default."""
+        post = Post(author=self.author, text='Тестовый пост')
+        self.assertEqual(
+            self.router.db_for_read(User, instance=post), 'default'
+        )
+        self.assertEqual(
+            self.router.db_for_read(Group, instance=post), 'default'
+        )
+        self.assertFalse(self.router.allow_migrate('shard_0', 'auth'))
+        self.assertFalse(
+            self.router.allow_migrate('shard_0', 'posts', model_name='group')
+        )
+        self.assertTrue(
+            self.router.allow_migrate('shard_0', 'posts', model_name='post')
+        )
+        self.assertIsNone(self.router.allow_migrate('default', 'auth'))
+
+
+@override_settings(POST_SHARDS=SHARDS, POST_SHARD_ID_BLOCK=10)
+class ShardDatabasesTest(TransactionTestCase):
+    """Настоящие базы шардов из settings_test."""
+    databases = {'default', *SHARDS}
+
+    def setUp(self):
+        # соединение, открытое до включения шардов, переоткрывается
+        # с настройками шарда (без проверки внешних ключей на default)
+        for alias in SHARDS:
+            connections[alias].close()
+        sharding.reserve(0)
+        self.first = User.objects.create(pk=2, username='first')
+        self.second = User.objects.create(pk=3, username='second')
+
+    def test_posts_and_comments_in_author_shard(self):
+        """Пост и комментарии лежат в шарде автора, лента общая."""
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {author}')
+            for author in (self.first, self.second)
+        ]
+        comment = Comment.objects.create(
+            post=posts[1], author=self.first, text='Комментарий'
+        )
+        self.assertTrue(
+            Post.objects.using('shard_0').filter(pk=posts[0].pk).exists()
+        )
+        self.assertTrue(
+            Comment.objects.using('shard_1').filter(pk=comment.pk).exists()
+        )
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertEqual(
+            {post.pk for post in sharding.merged(Post.objects.all())},
+            {post.pk for post in posts},
+        )
+
+    def test_ids_come_in_blocks(self):
+        """Один блок id на много вставок, id уникальны во всех шардах."""
+        with CaptureQueriesContext(connections['default']) as queries:
+            ids = [
+                Post.objects.create(
+                    author=(self.first, self.second)[i % 2], text='Пост'
+                ).pk
+                for i in range(10)
+            ]
+        self.assertEqual(ids, list(range(ids[0], ids[0] + 10)))
+        sequence = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "posts_shardsequence"')
+        ]
+        self.assertEqual(len(sequence), 1)
+
+    def test_shard_write_pins_reads(self):
+        """Запись в шард закрепляет пользователя за основной базой."""
+        routers.begin_request()
+        self.addCleanup(routers.end_request)
+        self.assertFalse(routers.has_written())
+        Post.objects.create(author=self.second, text='Пост')
+        self.assertTrue(routers.has_written())
+
+    def test_failed_source_delete_loses_nothing(self):
+        """Сбой удаления из source оставляет строки в обеих базах,
+        повторный перенос их не дублирует."""
+        post = Post.objects.create(author=self.first, text='Пост')
+        Comment.objects.create(post=post, author=self.second, text='Ком')
+        with mock.patch.object(
+            QuerySet, 'delete', side_effect=OperationalError('locked')
+        ):
+            with self.assertRaises(OperationalError):
+                sharding.move_author(self.first.pk, 'shard_0', 'shard_1')
+        for alias in SHARDS:
+            self.assertTrue(
+                Comment.objects.using(alias).filter(post_id=post.pk).exists()
+            )
+        sharding.move_author(self.first.pk, 'shard_0', 'shard_1')
+        self.assertFalse(Post.objects.using('shard_0').exists())
+        self.assertEqual(Post.objects.using('shard_1').count(), 1)
+        self.assertEqual(Comment.objects.using('shard_1').count(), 1)
+
+    def test_archive_commits_copy_before_shard_delete(self):
+        """Архивная копия коммитится раньше удаления из шарда."""
+        post = Post.objects.create(author=self.second, text='Пост')
+        Comment.objects.create(post=post, author=self.first, text='Ком')
+        Post.objects.using('shard_1').filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=365)
+        )
+        with mock.patch.object(
+            QuerySet, 'delete', side_effect=OperationalError('locked')
+        ):
+            with self.assertRaises(OperationalError):
+                archive.archive(days=30)
+        self.assertTrue(ArchivedPost.objects.filter(pk=post.pk).exists())
+        self.assertTrue(Post.objects.using('shard_1').exists())
+        self.assertEqual(archive.archive(days=30), 1)
+        self.assertFalse(Post.objects.using('shard_1').exists())
+        self.assertEqual(ArchivedPost.objects.count(), 1)
+        self.assertEqual(ArchivedComment.objects.count(), 1)
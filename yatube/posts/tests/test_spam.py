@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import spam
+from posts.forms import SPAM_ERROR
+from posts.models import Comment, Fingerprint, Post
+
+
+User = get_user_model()
+
+TEXT = (
+    'Лучшие скидки недели только сегодня заходите на наш сайт '
+    'и получите подарок за первую покупку'
+)
+
+
+@override_settings(SPAM_MAX_COPIES=2, RATE_LIMITS={})
+class SpamTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_fingerprint(self):
+        """Похожие тексты близки по SimHash, разные — далеки."""
+        base = spam.fingerprint(TEXT)
+        similar = spam.fingerprint(TEXT.replace('сегодня', 'завтра'))
+        other = spam.fingerprint(
+            'Сегодня в парке было тихо и пусто, только вороны '
+            'спорили о чем-то на старом клене'
+        )
+        self.assertLessEqual(spam.distance(base, similar), 6)
+        self.assertGreater(spam.distance(base, other), 10)
+        self.assertIsNone(spam.fingerprint('Спасибо за пост!'))
+        self.assertTrue(-2 ** 63 <= base < 2 ** 63)
+
+    def test_keys(self):
+        """Отпечатки в пределах SPAM_MAX_DISTANCE делят хотя бы ключ."""
+        base = spam.fingerprint(TEXT)
+        self.assertEqual(len(spam.keys(base)), 28)
+        for bits in ((0, 9, 17, 33, 41, 50), (7, 8, 63), (1, 2, 3, 4, 5, 6)):
+            other = base
+            for bit in bits:
+                other ^= 1 << bit
+            with self.subTest(bits=bits):
+                self.assertTrue(set(spam.keys(base)) & set(spam.keys(other)))
+
+    def test_comment_wave_blocked(self):
+        """Третья почти одинаковая копия комментария отклоняется."""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        texts = (TEXT, TEXT + ' сейчас', TEXT.replace('наш', 'этот'))
+        for text in texts:
+            self.client.post(url, {'text': text})
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(
+            Fingerprint.objects.filter(kind=Fingerprint.COMMENT).count(),
+            2 * 28,
+        )
+        # короткие одинаковые ответы не считаются спамом
+        for _ in range(3):
+            self.client.post(url, {'text': 'Спасибо!'})
+        self.assertEqual(Comment.objects.count(), 5)
+
+    def test_post_blocked_and_edit_allowed(self):
+        """Повтор поста отклоняется, правка своего поста — нет."""
+        for _ in range(2):
+            self.client.post(reverse('posts:post_create'), {'text': TEXT})
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': TEXT}
+        )
+        self.assertFormError(response, 'form', 'text', SPAM_ERROR)
+        self.assertEqual(Post.objects.filter(text=TEXT).count(), 2)
+        post = Post.objects.filter(text=TEXT).first()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': TEXT + ' снова'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, TEXT + ' снова')
+
+    def test_prune(self):
+        """Ключи вне окна не мешают и удаляются командой."""
+        Post.objects.create(
+            author=self.user, text=TEXT, simhash=spam.fingerprint(TEXT)
+        )
+        Fingerprint.objects.update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(
+            spam.near_duplicates(Fingerprint.POST, spam.fingerprint(TEXT)), 0
+        )
+        out = StringIO()
+        call_command('prune_fingerprints', stdout=out)
+        self.assertIn('Удалено отпечатков: 28', out.getvalue())
+
+    @override_settings(SPAM_MAX_CANDIDATES=5)
+    def test_close_candidates_first(self):
+        """Случайные совпадения одного ключа не вытесняют близкие копии."""
+        base = spam.fingerprint(TEXT)
+        # совпадают только два младших блока из восьми
+        far = (base ^ ((1 << 48) - 1) << 16) & spam.MASK
+        far -= (1 << 64) if far >> 63 else 0
+        for object_id in range(1, 11):
+            spam.store(Fingerprint.POST, object_id, far)
+        for object_id in (20, 21):
+            spam.store(Fingerprint.POST, object_id, base ^ 1 << 40)
+        self.assertEqual(spam.near_duplicates(Fingerprint.POST, base), 2)
+        self.assertEqual(
+            spam.near_duplicates(Fingerprint.POST, base, enough=1), 1
+        )
+
+    def test_deleted_copies_do_not_count(self):
+        """Ключи удаленного поста удаляются вместе с ним."""
+        post = Post.objects.create(
+            author=self.user, text=TEXT, simhash=spam.fingerprint(TEXT)
+        )
+        self.assertEqual(
+            Fingerprint.objects.filter(object_id=post.pk).count(), 28
+        )
+        post.delete()
+        self.assertFalse(
+            Fingerprint.objects.filter(object_id=post.pk).exists()
+        )
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import trending
+from posts.models import Comment, Group, Post, TrendingCounter
+
+
+User = get_user_model()
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа_2',
+            slug='test-slug_2',
+            description='Тестовое описание_2',
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.user, text='Тихий пост', group=cls.group_2,
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.user, text='Обсуждаемый пост', group=cls.group,
+        )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.hot_post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counters_updated_on_create(self):
+        """Посты и комментарии увеличивают счетчики интервала."""
+        counter = TrendingCounter.objects.get(
+            kind=TrendingCounter.POST, object_id=self.hot_post.pk
+        )
+        self.assertEqual(counter.count, 4)
+
+    def test_trending_page_order(self):
+        """Страница популярного упорядочена по активности."""
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            response.context['posts'], [self.hot_post, self.quiet_post]
+        )
+        self.assertEqual(
+            response.context['groups'], [self.group, self.group_2]
+        )
+
+    @override_settings(TRENDING_WINDOW_BUCKETS=0)
+    def test_old_buckets_compacted(self):
+        """Интервалы за пределами окна удаляются."""
+        trending.refresh()
+        self.assertFalse(TrendingCounter.objects.exists())
+
+    def test_compacted_on_write_not_on_read(self):
+        """Старые интервалы удаляет запись в новом интервале, а не GET."""
+        old = TrendingCounter.objects.create(
+            kind=TrendingCounter.POST, object_id=self.quiet_post.pk,
+            bucket=trending.current_bucket() - 1000, count=1,
+        )
+        Client().get(reverse('posts:trending'))
+        self.assertTrue(TrendingCounter.objects.filter(pk=old.pk).exists())
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertFalse(TrendingCounter.objects.filter(pk=old.pk).exists())
@@ -0,0 +1,120 @@
+"""
+Популярные посты и группы.
+
+Активность считается по интервалам длиной TRENDING_BUCKET_SECONDS:
+каждый пост и комментарий увеличивает счетчик текущего интервала.
+Оценка — сумма счетчиков за окно с экспоненциальным затуханием по
+возрасту интервала. Top-N пересчитывается не чаще, чем раз в
+TRENDING_REFRESH_SECONDS, одним запросом (core.cache.stampede).
+Интервалы, вышедшие за окно, удаляет запись первого счетчика нового
+интервала и команда refresh_trending, а не чтение страницы.
+"""
+import heapq
+import math
+import time
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.cache.stampede import get_or_recompute
+from posts.models import TrendingCounter
+
+
+POSTS_KEY = 'trending:posts'
+GROUPS_KEY = 'trending:groups'
+
+
+def current_bucket():
+    return int(time.time() // settings.TRENDING_BUCKET_SECONDS)
+
+
+def _bump(kind, object_id, weight=1):
+    bucket = current_bucket()
+    counters = TrendingCounter.objects.filter(
+        kind=kind, object_id=object_id, bucket=bucket
+    )
+    if counters.update(count=F('count') + weight):
+        return
+    try:
+        with transaction.atomic():
+            TrendingCounter.objects.create(
+                kind=kind,
+                object_id=object_id,
+                bucket=bucket,
+                count=weight,
+            )
+    except IntegrityError:
+        # счетчик успел создать параллельный запрос
+        counters.update(count=F('count') + weight)
+        return
+    # начался новый интервал: старые удаляет один запрос на интервал
+    if cache.add(
+        f'trending:compacted:{bucket}', True,
+        settings.TRENDING_BUCKET_SECONDS,
+    ):
+        compact()
+
+
+def record_post(post):
+    _bump(TrendingCounter.POST, post.pk)
+    if post.group_id:
+        _bump(
+            TrendingCounter.GROUP, post.group_id,
+            settings.TRENDING_POST_WEIGHT,
+        )
+
+
+def record_comment(comment):
+    _bump(TrendingCounter.POST, comment.post_id)
+    if comment.post.group_id:
+        _bump(TrendingCounter.GROUP, comment.post.group_id)
+
+
+def compact():
+    """Удаляет интервалы, вышедшие за окно."""
+    TrendingCounter.objects.filter(
+        bucket__lte=current_bucket() - settings.TRENDING_WINDOW_BUCKETS
+    ).delete()
+
+
+def _top(kind):
+    now = current_bucket()
+    decay = math.log(2) / settings.TRENDING_HALF_LIFE_BUCKETS
+    scores = {}
+    rows = TrendingCounter.objects.filter(
+        kind=kind, bucket__gt=now - settings.TRENDING_WINDOW_BUCKETS
+    ).values_list('object_id', 'bucket', 'count')
+    for object_id, bucket, count in rows.iterator():
+        weight = count * math.exp(-decay * (now - bucket))
+        scores[object_id] = scores.get(object_id, 0) + weight
+    return heapq.nlargest(
+        settings.TRENDING_SIZE, scores.items(), key=itemgetter(1)
+    )
+
+
+def top_posts():
+    """[(id поста, оценка)] по убыванию оценки."""
+    return get_or_recompute(
+        POSTS_KEY,
+        lambda: _top(TrendingCounter.POST),
+        settings.TRENDING_REFRESH_SECONDS,
+    )
+
+
+def top_groups():
+    """[(id группы, оценка)] по убыванию оценки."""
+    return get_or_recompute(
+        GROUPS_KEY,
+        lambda: _top(TrendingCounter.GROUP),
+        settings.TRENDING_REFRESH_SECONDS,
+    )
+
+
+def refresh():
+    compact()
+    cache.delete_many((POSTS_KEY, GROUPS_KEY))
+    top_posts()
+    top_groups()
@@ -7,6 +7,9 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('ranked/', views.ranked_index, name='index_ranked'),
+    path('trending/', views.trending_index, name='trending'),
+    path('live/', views.live_feed, name='live'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
@@ -18,6 +21,12 @@ urlpatterns = [
         name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
+    path(
+        'notifications/',
+        views.notification_list,
+        name='notifications'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,29 +1,86 @@
+import json
+
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.core.exceptions import PermissionDenied
+from django.db import router, transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 
-from posts.models import Post, Group, Follow, User
+from core.db.batching import write_queue
+from core.pubsub import Full
+from posts import live, notifications, ranking, sharding, trending
+from posts.archive import ArchiveChain, get_post_or_404
+from posts.deletion import hidden_groups, hidden_users, visible
+from posts.models import Post, Group, Follow, Notification, User
 from posts.forms import PostForm, CommentForm
+from posts.follow_graph import follow_graph
+from posts.recommendations import mark_stale, suggested_authors
+
+
+# больше id в IN (...) SQLite не примет, дальше фильтруем через JOIN
+MAX_IN_AUTHORS = 900
 
 
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = sharding.merged(visible(Post.objects.all()))
     paginator = Paginator(post_list, settings.NUB_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'feed_key': 'latest',
+    }
+    return render(request, template, context)
+
+
+def ranked_index(request):
+    template = 'posts/index.html'
+    paginator = Paginator(
+        ranking.ranked_post_ids(request.user), settings.NUB_OF_POSTS
+    )
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = ranking.load_posts(page_obj.object_list)
+    context = {
+        'page_obj': page_obj,
+        'ranked': True,
+        'feed_key': f'ranked:{request.user.pk or 0}',
+    }
+    return render(request, template, context)
+
+
+def trending_index(request):
+    template = 'posts/trending.html'
+    top_posts = trending.top_posts()
+    top_groups = trending.top_groups()
+    posts = sharding.in_bulk(
+        sharding.with_related(visible(Post.objects.all())),
+        [pk for pk, score in top_posts],
+    )
+    groups = Group.objects.exclude(pk__in=hidden_groups()).in_bulk(
+        [pk for pk, score in top_groups]
+    )
+    context = {
+        'trending': True,
+        'posts': [posts[pk] for pk, score in top_posts if pk in posts],
+        'groups': [groups[pk] for pk, score in top_groups if pk in groups],
     }
     return render(request, template, context)
 
 
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = get_object_or_404(
+        Group.objects.exclude(pk__in=hidden_groups()), slug=slug
+    )
+    post_list = ArchiveChain(
+        sharding.merged(visible(group.posts.all())),
+        visible(group.archived_posts.all()),
+    )
     paginator = Paginator(post_list, settings.NUB_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -36,30 +93,35 @@ def group_posts(request, slug):
 
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts_author = author.posts.all()
+    author = get_object_or_404(
+        User.objects.exclude(pk__in=hidden_users()), username=username
+    )
+    posts_author = ArchiveChain(
+        author.posts.all(), author.archived_posts.all()
+    )
     paginator = Paginator(posts_author, settings.NUB_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     following = (
-        request.user.is_authenticated and author.following.filter(
-            user=request.user).exists()
+        request.user.is_authenticated
+        and follow_graph.is_following(request.user.pk, author.pk)
     )
     context = {
         'author': author,
         'posts_author': posts_author,
         'page_obj': page_obj,
         'following': following,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, template, context)
 
 
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_404(post_id)
     comment_form = CommentForm()
-    comments_all = post.comments.all()
-    count = post.author.posts.all().count()
+    comments_all = visible(post.comments.all())
+    count = post.author.posts.count() + post.author.archived_posts.count()
     context = {
         'post': post,
         'count': count,
@@ -87,7 +149,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = sharding.get_or_404(Post.objects.all(), pk=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post.pk)
     form = PostForm(
@@ -109,35 +171,95 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     template = 'posts:post_detail'
-    post = get_object_or_404(Post, pk=post_id)
+    post = sharding.get_or_404(Post.objects.all(), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        write_queue.save(comment)
     return redirect(template, post_id=post_id)
 
 
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(author__following__user=request.user)
+    authors = follow_graph.following(request.user.pk)
+    post_list = visible(Post.objects.all())
+    # на шардах таблицы подписок нет, список авторов делится по шардам
+    if sharding.is_sharded() or len(authors) <= MAX_IN_AUTHORS:
+        post_list = sharding.for_authors(post_list, authors)
+    else:
+        post_list = post_list.filter(author__following__user=request.user)
     paginator = Paginator(post_list, settings.NUB_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'suggestions': suggested_authors(request.user),
     }
     return render(request, template, context)
 
 
+def live_feed(request):
+    """Поток SSE с числом новых постов для главной, группы или подписок.
+    Лента выбирается параметром ?group=<slug> или ?follow=1."""
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+        channels = [live.group_channel(group.pk)]
+    elif request.GET.get('follow'):
+        if not request.user.is_authenticated:
+            raise PermissionDenied
+        channels = [
+            live.author_channel(author_id)
+            for author_id in follow_graph.following(request.user.pk)
+        ]
+    else:
+        channels = [live.FEED_CHANNEL]
+    try:
+        subscription = live.subscribe(channels)
+    except Full:
+        response = HttpResponse(status=503)
+        response['Retry-After'] = str(settings.SSE_RETRY_MS // 1000 or 1)
+        return response
+    response = StreamingHttpResponse(
+        live.stream(subscription), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен копить события в буфере
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def notification_list(request):
+    template = 'posts/notifications.html'
+    paginator = Paginator(
+        Notification.objects.filter(user=request.user).select_related(
+            'author'
+        ),
+        settings.NUB_OF_POSTS,
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    # страница уже собрана: отметка о прочтении не прячет новые
+    # посты от того, кто их сейчас смотрит
+    page_obj.object_list = list(page_obj.object_list)
+    notifications.mark_read(request.user.pk)
+    return render(request, template, {'page_obj': page_obj})
+
+
 @login_required
 def profile_follow(request, username):
     template = 'posts:profile'
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        # граф другого процесса может отставать: пишем всегда,
+        # get_or_create сам не создаст повторную подписку
+        write_queue.submit(
+            lambda: Follow.objects.get_or_create(
+                user=request.user, author=author
+            )
+        )
         return redirect(template, username=username)
     else:
         raise PermissionDenied
@@ -147,7 +269,106 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     template = 'posts:profile'
     author = get_object_or_404(User, username=username)
-    follower = Follow.objects.filter(user=request.user, author=author)
-    if follower.exists():
-        follower.delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect(template, username=username)
+
+
+def _usernames(data, key):
+    names = data.get(key, [])
+    if not isinstance(names, list) or not all(
+        isinstance(name, str) for name in names
+    ):
+        raise ValueError(f'{key}: ожидается список имен пользователей')
+    return list(dict.fromkeys(names))
+
+
+def _bulk_names(request):
+    """Имена из тела follow_bulk; ValueError с текстом для ответа 400."""
+    data = json.loads(request.body)
+    if not isinstance(data, dict):
+        raise ValueError('ожидается объект JSON')
+    follow = _usernames(data, 'follow')
+    unfollow = _usernames(data, 'unfollow')
+    names = set(follow) | set(unfollow)
+    if len(names) < len(follow) + len(unfollow):
+        raise ValueError('имя не может быть и в follow, и в unfollow')
+    if len(names) > settings.FOLLOW_BULK_MAX:
+        raise ValueError(f'не больше {settings.FOLLOW_BULK_MAX} имен')
+    return follow, unfollow, names
+
+
+def _follows_changed(user_id, added, removed, using):
+    """Граф, рекомендации и уведомления после bulk_create и DELETE,
+    которые идут мимо сигналов Follow."""
+    for author_id in added:
+        follow_graph.add(user_id, author_id, using)
+    for author_id in removed:
+        follow_graph.remove(user_id, author_id, using)
+    if added or removed:
+        mark_stale(user_id)
+    if removed:
+        notifications.forget(user_id, removed)
+
+
+def _bulk_response(user_id, names, found, following, rejected):
+    return JsonResponse({
+        'following': sorted(
+            name for name, pk in found.items() if pk in following
+        ),
+        'not_following': sorted(
+            name for name, pk in found.items() if pk not in following
+        ),
+        'not_found': sorted(names - set(found)),
+        'rejected': rejected,
+        'following_count': follow_graph.following_count(user_id),
+    })
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка и отписка списком: {"follow": [...], "unfollow": [...]}.
+
+    Повтор запроса ничего не меняет. Имена разрешаются одним запросом,
+    подписки создаются одним bulk_create, отписки — одним DELETE.
+    В ответе — состояние подписок на все названные имена.
+    """
+    try:
+        follow, unfollow, names = _bulk_names(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    user = request.user
+    found = dict(
+        User.objects.filter(username__in=names).values_list('username', 'pk')
+    )
+    # на себя подписаться нельзя, как и в profile_follow
+    rejected = [name for name in follow if found.get(name) == user.pk]
+    to_follow = {found[name] for name in follow if name in found} - {user.pk}
+    to_unfollow = {found[name] for name in unfollow if name in found}
+    using = router.db_for_write(Follow)
+    follows = Follow.objects.using(using).filter(user=user)
+    following = set(
+        follows.filter(
+            author_id__in=to_follow | to_unfollow
+        ).values_list('author_id', flat=True)
+    )
+    added = to_follow - following
+    removed = to_unfollow & following
+    with transaction.atomic(using=using):
+        Follow.objects.using(using).bulk_create(
+            [Follow(user=user, author_id=author_id) for author_id in added],
+            ignore_conflicts=True,
+        )
+        if removed:
+            # у Follow нет зависимых строк, поэтому _raw_delete удаляет
+            # то же, что delete(), но без SELECT сборщика и сигнала на
+            # каждую строку: их работу _follows_changed делает пачкой
+            follows.filter(author_id__in=removed)._raw_delete(using)
+        # граф и уведомления меняем только после коммита: откат
+        # транзакции не должен оставить в них чужих подписок
+        transaction.on_commit(
+            lambda: _follows_changed(user.pk, added, removed, using),
+            using=using,
+        )
+    following = (following | added) - removed
+    return _bulk_response(user.pk, names, found, following, rejected)
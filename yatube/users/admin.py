@@ -0,0 +1,18 @@
+from django.contrib import admin
+# регистрирует стандартный UserAdmin, который заменяем ниже:
+# users стоит в INSTALLED_APPS раньше django.contrib.auth
+from django.contrib.auth import admin as auth_admin
+from django.contrib.auth import get_user_model
+
+from posts.admin import BackgroundDeletionAdmin
+
+
+User = get_user_model()
+
+
+class UserAdmin(BackgroundDeletionAdmin, auth_admin.UserAdmin):
+    pass
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
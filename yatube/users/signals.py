@@ -0,0 +1,26 @@
+from django.contrib.auth import user_logged_out
+from django.db.models.signals import post_delete, post_save
+
+from users.backends import User, invalidate_user
+
+
+def user_changed(sender, instance, **kwargs):
+    # смена пароля тоже приходит сюда: set_password() + save()
+    invalidate_user(instance.pk)
+
+
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
+
+
+def connect_signals():
+    post_save.connect(
+        user_changed, sender=User, dispatch_uid='users.user_saved'
+    )
+    post_delete.connect(
+        user_changed, sender=User, dispatch_uid='users.user_deleted'
+    )
+    user_logged_out.connect(
+        user_logged_out_handler, dispatch_uid='users.user_logged_out'
+    )
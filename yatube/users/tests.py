@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.backends import user_cache_key
+
+
+User = get_user_model()
+
+
+class CachedSessionUserTest(TestCase):
+    def setUp(self):
+        self.cache = caches[settings.USER_CACHE_ALIAS]
+        self.user = User.objects.create_user(
+            username='auth', password='1234567'
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_logged_in_request_without_session_and_user_queries(self):
+        """Сессия и пользователь не читаются из базы."""
+        url = reverse('posts:follow_index')
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+        for query in queries:
+            self.assertNotIn('django_session', query['sql'])
+            self.assertNotIn('FROM "auth_user" WHERE', query['sql'])
+
+    def test_user_edit_invalidates_cache(self):
+        """Изменение пользователя сбрасывает кэш."""
+        self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIsNotNone(self.cache.get(user_cache_key(self.user.pk)))
+        self.user.set_password('7654321')
+        self.user.save()
+        self.assertIsNone(self.cache.get(user_cache_key(self.user.pk)))
+
+    def test_logout_invalidates_cache(self):
+        """Выход сбрасывает кэш и сессию."""
+        self.authorized_client.get(reverse('posts:follow_index'))
+        self.authorized_client.get(reverse('users:logout'))
+        self.assertIsNone(self.cache.get(user_cache_key(self.user.pk)))
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
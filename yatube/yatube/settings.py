@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 import os
 
 NUB_OF_POSTS = 10
+NUB_OF_SUGGESTIONS = 5
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -56,10 +57,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.compression.CompressionMiddleware',
+    'core.middleware.static.StaticFilesMiddleware',
+    'core.middleware.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,6 +84,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.unread_notifications',
             ],
         },
     },
@@ -97,6 +103,66 @@ DATABASES = {
     }
 }
 
+# профиль SQLite, применяется к каждому новому соединению (core.db.sqlite):
+# WAL не блокирует читателей на время записи, synchronous=NORMAL
+# в режиме WAL делает fsync только на checkpoint, а busy_timeout
+# заставляет писателя ждать блокировку вместо "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# реплики только для чтения, локально это копии db.sqlite3, которые
+# обновляет команда sync_replicas. Пример:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ('replica',)
+DATABASE_REPLICAS = ()
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.db.routers.ReplicaRouter',
+]
+# представления, чтение в которых можно отдать репликам
+DATABASE_REPLICA_VIEWS = (
+    'posts:index',
+    'posts:profile',
+    'posts:group_list',
+    'posts:post_detail',
+)
+# сколько секунд после записи пользователь читает с основной базы
+DATABASE_REPLICA_STICKY_SECONDS = 10
+
+# шардирование постов (posts.sharding): Post и Comment раскладываются
+# по базам POST_SHARDS по author_id, пользователи, группы и подписки
+# остаются в default. Пустой кортеж — все в default. После изменения
+# списка шардов нужно запустить rebalance_shards
+# for number in range(4):
+#     DATABASES[f'shard_{number}'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, f'db.shard_{number}.sqlite3'),
+#     }
+# POST_SHARDS = tuple(f'shard_{number}' for number in range(4))
+POST_SHARDS = ()
+# id постов и комментариев на шардах выдаются процессу блоками
+POST_SHARD_ID_BLOCK = 100
+
+# групповые коммиты (core.db.batching): комментарии и подписки
+# пишет один поток, одной транзакцией на окно в миллисекундах;
+# 0 — писать сразу в потоке запроса. Выключено: на одном процессе
+# очередь медленнее (см. bench_writes), включать под многопроцессную
+# запись на медленный диск. WRITE_QUEUE_TIMEOUT — сколько запрос ждет
+# коммита; после WriteTimeout уже начатая запись может закоммититься
+WRITE_QUEUE_WINDOW_MS = 0
+WRITE_QUEUE_MAX_BATCH = 100
+WRITE_QUEUE_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,21 +202,186 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_collected')
+# collectstatic пишет имена с хешем содержимого и сжатые .gz/.br копии,
+# core.middleware.static отдает их с Cache-Control: immutable
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# сжатая копия сохраняется, только если она меньше 90% оригинала
+STATIC_COMPRESS_MAX_RATIO = 0.9
+# время кэширования файлов без хеша в имени
+STATIC_MAX_AGE = 60
+
+# сжатие ответов (core.middleware.compression): HTML без отступов,
+# br или gzip для ответов длиннее RESPONSE_COMPRESS_MIN_LENGTH байт;
+# уровни подобраны под сжатие на лету, а не под максимальную степень
+HTML_MINIFY = True
+RESPONSE_COMPRESS_MIN_LENGTH = 200
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 4
 
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# адрес сайта для ссылок в письмах
+SITE_URL = 'http://127.0.0.1:8000'
+
+# еженедельная рассылка (posts.digest, команда send_digest): посты за
+# DIGEST_DAYS дней, не больше DIGEST_MAX_POSTS в письме; таблицы
+# читаются пачками по DIGEST_CHUNK_SIZE строк, письма уходят пачками
+# по DIGEST_BATCH_SIZE через одно соединение
+DIGEST_SUBJECT = 'Новые записи ваших авторов за неделю'
+DIGEST_DAYS = 7
+DIGEST_MAX_POSTS = 10
+DIGEST_TEXT_LENGTH = 200
+DIGEST_CHUNK_SIZE = 2000
+DIGEST_BATCH_SIZE = 500
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# загруженные файлы отдает core.views.serve_media; миниатюры sorl
+# лежат в cache/ под именами-хешами и не меняются
+MEDIA_MAX_AGE = 30 * 24 * 60 * 60
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+# префикс internal-location nginx, например '/protected-media/':
+# тогда файл отправляет nginx по X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = ''
 
 
+# L1 — LRU в памяти процесса, L2 — общий для всех процессов файл SQLite
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'COMPRESS_MIN_LENGTH': 1024,
+        },
+    },
+    # сессии, пользователи сессий и версия графа подписок: отдельный
+    # файл, чтобы вытеснение фрагментов не разлогинивало пользователей,
+    # и без L1, чтобы выход, смена пароля и подписки сразу были видны
+    # всем процессам
+    'sessions': {
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': os.path.join(BASE_DIR, 'sessions.sqlite3'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+            'L1_TIMEOUT': 0,
+        },
+    },
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# пользователь сессии загружается из кэша (users.backends)
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+USER_CACHE_ALIAS = 'sessions'
+USER_CACHE_TIMEOUT = 60 * 60
+
+# защита от одновременного пересчета (core.cache.stampede):
+# сколько секунд после срока можно отдавать устаревшее значение,
+# пока его пересчитывает один запрос
+CACHE_STALE_SECONDS = 60
+# время жизни блокировки пересчета
+CACHE_LOCK_TIMEOUT = 10
+# сколько ждать чужого пересчета, если устаревшего значения нет
+CACHE_LOCK_WAIT = 2
+# чем больше, тем раньше начинается вероятностное обновление
+CACHE_EARLY_REFRESH_BETA = 1.0
+
+# ограничение частоты запросов (core.middleware.ratelimit): корзина
+# на столько-то запросов, полностью пополняется за столько-то секунд,
+# отдельная для каждого пользователя, для анонимов — для каждого IP
+RATE_LIMIT_CACHE_ALIAS = 'default'
+RATE_LIMITS = {
+    # представление: (запросов, секунд, методы)
+    'posts:add_comment': (10, 60, ('POST',)),
+    'posts:post_create': (5, 300, ('POST',)),
+    'posts:profile_follow': (30, 60, ('GET', 'POST')),
+    'posts:follow_bulk': (10, 60, ('POST',)),
+}
+# анонимные запросы страниц дальше RATE_LIMIT_DEEP_PAGE
+RATE_LIMIT_DEEP_PAGE = 5
+RATE_LIMIT_DEEP_PAGES = {
+    'posts:index': (30, 60),
 }
 
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# сколько имен можно передать в posts:follow_bulk за один запрос
+FOLLOW_BULK_MAX = 100
+
+# граф подписок в памяти процесса (posts.follow_graph) целиком
+# перечитывается из базы не реже, чем раз в столько секунд
+FOLLOW_GRAPH_TTL = 300
+# версия графа хранится в кэше без L1: подписку в одном процессе
+# другие должны заметить на следующем же запросе
+FOLLOW_GRAPH_CACHE_ALIAS = 'sessions'
+
+# популярное (posts.trending): активность считается по интервалам,
+# оценка затухает вдвое за TRENDING_HALF_LIFE_BUCKETS интервалов
+TRENDING_BUCKET_SECONDS = 10 * 60
+TRENDING_WINDOW_BUCKETS = 6 * 24
+TRENDING_HALF_LIFE_BUCKETS = 3 * 6
+# новый пост в группе весит больше одного комментария
+TRENDING_POST_WEIGHT = 3
+TRENDING_SIZE = 10
+TRENDING_REFRESH_SECONDS = 60
+
+# ранжированная лента (posts.ranking): оценка кандидата — свежесть
+# (вдвое меньше за FEED_HALF_LIFE_HOURS) плюс log(1 + комментарии),
+# для читателя добавляется бонус за подписку на автора
+FEED_CANDIDATE_POOL = 2000
+FEED_CANDIDATES = 300
+FEED_HALF_LIFE_HOURS = 24
+FEED_COMMENT_WEIGHT = 0.5
+FEED_FOLLOW_WEIGHT = 1.0
+FEED_REFRESH_SECONDS = 60
+
+# холодное хранение (posts.archive): посты старше ARCHIVE_AFTER_DAYS
+# вместе с комментариями переносятся в архивные таблицы
+ARCHIVE_AFTER_DAYS = 365
+
+# повторы текста (posts.spam): пост или комментарий отклоняется, если
+# за SPAM_WINDOW_HOURS уже было SPAM_MAX_COPIES почти таких же текстов
+# (SimHash отличается не больше чем в SPAM_MAX_DISTANCE битах из 64).
+# На текст пишется C(SPAM_BLOCKS, SPAM_BLOCKS - SPAM_MAX_DISTANCE)
+# ключей по 64 / SPAM_BLOCKS * (SPAM_BLOCKS - SPAM_MAX_DISTANCE) бит:
+# 8 и 6 дают 28 ключей по 16 бит. Короче ключ — больше случайных
+# кандидатов, больше расстояние — больше ключей
+SPAM_MIN_WORDS = 6
+SPAM_BLOCKS = 8
+SPAM_MAX_DISTANCE = 6
+SPAM_MAX_COPIES = 3
+SPAM_WINDOW_HOURS = 24
+SPAM_MAX_CANDIDATES = 200
+
+# уведомления о новых постах (posts.notifications): вставка строк
+# пачками, время жизни закэшированного числа непрочитанных
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_COUNT_TIMEOUT = 10 * 60
+
+# потоков WSGI-сервера в одном процессе (gunicorn --threads, threads
+# в uwsgi); должно совпадать с конфигурацией сервера
+WSGI_THREADS = 32
+
+# живое обновление лент (posts.live): потоков SSE на процесс — доля
+# WSGI_THREADS, чтобы обычным запросам оставались свободные потоки;
+# сколько живет поток, как часто слать пинг, через сколько
+# переподключаться
+SSE_MAX_CONNECTIONS = WSGI_THREADS // 4
+SSE_MAX_SECONDS = 5 * 60
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
+SSE_MAX_PENDING = 100
+
+# карточки постов (posts.templatetags.post_cards) кэшируются по id
+# и времени изменения поста и по версиям автора и группы, так что
+# правка поста, имени автора или группы сама сбрасывает карточку
+POST_CARD_TIMEOUT = 24 * 60 * 60
@@ -0,0 +1,45 @@
+"""
+Настройки для тестов.
+
+Кэш и сессии лежат во временном каталоге: тесты пишут в кэш и
+очищают его, и без этого они стирали бы cache.sqlite3 и
+sessions.sqlite3 разработчика в BASE_DIR.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from yatube.settings import *  # noqa: F401,F403
+from yatube.settings import CACHES, DATABASES
+
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
+CACHES = {
+    alias: dict(
+        config,
+        LOCATION=os.path.join(
+            CACHE_DIR, os.path.basename(config['LOCATION'])
+        ),
+    )
+    for alias, config in CACHES.items()
+}
+
+# базы шардов для тестов шардирования (posts.tests.test_sharding):
+# файлы, а не память, чтобы тест мог переподключиться к ним после
+# включения POST_SHARDS и получить настройки соединения шарда
+TEST_SHARDS = ('shard_0', 'shard_1')
+DATABASES = {
+    **DATABASES,
+    **{
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(CACHE_DIR, f'{alias}.sqlite3'),
+            'TEST': {
+                'NAME': os.path.join(CACHE_DIR, f'test_{alias}.sqlite3'),
+            },
+        }
+        for alias in TEST_SHARDS
+    },
+}